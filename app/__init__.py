@@ -6,15 +6,20 @@ from flask_jwt_extended import JWTManager
 from celery import Celery
 from flask_cors import CORS 
 
-from app.config import Config
+from app.config import CeleryConfig, Config
 from app.utils.token_blacklist import TokenBlacklist
+from app.utils.db_pool import init_pools
+from app.utils.db_routing import RoutingSession
+from app.utils.profiling import RequestProfiler
 
 # Initialize Flask extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 mail = Mail()
 migrate = Migrate()
 jwt = JWTManager()
+profiler = RequestProfiler()
 celery = Celery(__name__, broker=Config.broker_url, backend=Config.result_backend)
+celery.config_from_object(CeleryConfig)
 
 def create_app():
     app = Flask(__name__)
@@ -24,12 +29,16 @@ def create_app():
 
     # Initialize extensions with app
     db.init_app(app)
+    init_pools(app, db)
+    profiler.init_app(app, db)
     mail.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
 
     @jwt.token_in_blocklist_loader
     def check_if_token_revoked(jwt_header, jwt_payload):
+        if not app.config.get("JWT_BLACKLIST_ENABLED"):
+            return False
         jti = jwt_payload["jti"]
         blacklist = TokenBlacklist()
         return blacklist.is_blacklisted(jti)
@@ -55,6 +64,18 @@ def create_app():
     from app.routes import api
     app.register_blueprint(api)
 
+    # Maintenance CLI commands (flask backfill-reminder-schedule)
+    from app.commands import register_commands
+    register_commands(app)
+
+    from app.utils.metrics import registry
+    from app.utils.task_metrics import collect_task_runs
+    registry.register_collector(collect_task_runs)
+
+    # Compile notification templates once, before the first send
+    from app.utils.message_templates import precompile
+    precompile()
+
     # Celery context integration
     celery.conf.update(app.config)
 
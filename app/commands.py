@@ -0,0 +1,34 @@
+from datetime import date, timedelta
+
+import click
+from flask import current_app
+
+from app import db
+from app.utils.payments import refresh_tenant_rollups
+from app.utils.reminder_schedule import expand_schedule
+
+
+def register_commands(app):
+
+    @app.cli.command("backfill-reminder-schedule")
+    def backfill_reminder_schedule():
+        """One-off: expand reminder_schedule rows for every existing PENDING payment.
+
+        Run once when deploying schedule-driven reminders; before it, payments
+        created earlier have no rows and get no reminders. Safe to repeat.
+        """
+        send_from = date.today() - timedelta(days=current_app.config.get("REMINDER_CATCHUP_MAX_DAYS", 3))
+        considered = expand_schedule(send_from=send_from)
+        db.session.commit()
+        click.echo(f"Reminder schedule backfilled: {considered} rows considered")
+
+    @app.cli.command("backfill-tenant-rollups")
+    def backfill_tenant_rollups():
+        """One-off: compute outstanding_balance, oldest_unpaid_month and next_due_date for every tenant.
+
+        Run once after adding the rollup columns; until then existing tenants
+        read as paid up. Safe to repeat.
+        """
+        updated = refresh_tenant_rollups()
+        db.session.commit()
+        click.echo(f"Tenant rollups backfilled: {updated} tenants updated")
@@ -2,12 +2,55 @@ import os
 from datetime import timedelta
 from dotenv import load_dotenv
 
+from app.utils.db_pool import TimedQueuePool
+
 load_dotenv()
 
+
+def _env_bool(name, default):
+    return os.getenv(name, default).lower() in ["true", "1", "yes"]
+
+
+def engine_options(database_uri):
+    options = {
+        # Pre-ping costs a round-trip per checkout; disable it when
+        # pool_recycle already keeps connections younger than server timeouts.
+        "pool_pre_ping": _env_bool("SQLALCHEMY_POOL_PRE_PING", "True"),
+    }
+
+    # SQLite (local runs, benchmarks) keeps the driver's default pool.
+    if not database_uri or database_uri.startswith("sqlite"):
+        return options
+
+    options.update({
+        "poolclass": TimedQueuePool,
+        # Defaults are set per worker by gunicorn.conf.py to match its request concurrency.
+        "pool_size": int(os.getenv("SQLALCHEMY_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("SQLALCHEMY_MAX_OVERFLOW", 10)),
+        "pool_timeout": float(os.getenv("SQLALCHEMY_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("SQLALCHEMY_POOL_RECYCLE", 1800)),
+    })
+
+    connect_args = {}
+    if os.getenv("DB_CONNECT_TIMEOUT"):
+        connect_args["connect_timeout"] = int(os.getenv("DB_CONNECT_TIMEOUT"))
+    if os.getenv("DB_STATEMENT_TIMEOUT_MS"):
+        connect_args["options"] = f"-c statement_timeout={int(os.getenv('DB_STATEMENT_TIMEOUT_MS'))}"
+    if connect_args:
+        options["connect_args"] = connect_args
+
+    return options
+
+
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("SQLALCHEMY_DATABASE_URI") or os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_ENGINE_OPTIONS = {"pool_pre_ping": True}
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+
+    # Optional read replica for dashboard/list queries (see app.utils.db_routing).
+    SQLALCHEMY_REPLICA_URI = os.getenv("SQLALCHEMY_REPLICA_URI")
+    SQLALCHEMY_BINDS = {"replica": SQLALCHEMY_REPLICA_URI} if SQLALCHEMY_REPLICA_URI else {}
+    REPLICA_READ_YOUR_WRITES_SECONDS = int(os.getenv("REPLICA_READ_YOUR_WRITES_SECONDS", 5))
 
     MAIL_SERVER = os.getenv("MAIL_SERVER", "smtp.gmail.com")
     MAIL_PORT = int(os.getenv("MAIL_PORT", 587))
@@ -16,25 +59,152 @@ class Config:
     MAIL_USERNAME = os.getenv('MAIL_USERNAME')
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.getenv("MAIL_DEFAULT_SENDER", MAIL_USERNAME)
+    MAIL_SUPPRESS_SEND = os.getenv("MAIL_SUPPRESS_SEND", "False").lower() in ["true", "1", "yes"]
+    # Messages per SMTP connection in batched sends before reconnecting
+    MAIL_MAX_EMAILS = int(os.getenv("MAIL_MAX_EMAILS", 100))
 
     # --- CELERY / REDIS ---
     REDIS_URL = os.getenv("REDIS_URL")
+    REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 10))
+    REDIS_POOL_TIMEOUT = int(os.getenv("REDIS_POOL_TIMEOUT", 5))
     broker_url = REDIS_URL
     result_backend = REDIS_URL
 
+    # --- TASK LOCKS ---
+    # Redis lease per scheduled task run; renewed by a heartbeat every TTL/3
+    TASK_LOCKS_ENABLED = os.getenv("TASK_LOCKS_ENABLED", "True").lower() in ["true", "1", "yes"]
+    TASK_LOCK_TTL_SECONDS = int(os.getenv("TASK_LOCK_TTL_SECONDS", 60))
+    # Days of persisted task runs (task_runs) kept by the daily prune job
+    TASK_RUN_RETENTION_DAYS = int(os.getenv("TASK_RUN_RETENTION_DAYS", 14))
+
+    # --- NOTIFICATION OUTBOX ---
+    OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 100))
+    OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", 300))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 5))
+    OUTBOX_RETRY_BACKOFF_SECONDS = int(os.getenv("OUTBOX_RETRY_BACKOFF_SECONDS", 60))
+    OUTBOX_DISPATCHERS = int(os.getenv("OUTBOX_DISPATCHERS", 1))
+    # Concurrent sends per channel within one dispatcher (one thread pool each)
+    OUTBOX_EMAIL_CONCURRENCY = int(os.getenv("OUTBOX_EMAIL_CONCURRENCY", 4))
+    OUTBOX_SMS_CONCURRENCY = int(os.getenv("OUTBOX_SMS_CONCURRENCY", 8))
+    OUTBOX_WHATSAPP_CONCURRENCY = int(os.getenv("OUTBOX_WHATSAPP_CONCURRENCY", 8))
+    # Channels used for tenants without their own preference
+    DEFAULT_REMINDER_CHANNELS = os.getenv("DEFAULT_REMINDER_CHANNELS", "EMAIL")
+    # Locale of notification templates (falls back to "en")
+    NOTIFICATION_LOCALE = os.getenv("NOTIFICATION_LOCALE", "en")
+
+    # --- REMINDER SLOTS ---
+    # Local start times in each owner's time zone; tenants are split evenly across them
+    REMINDER_SLOTS = os.getenv("REMINDER_SLOTS", "09:00,10:00,11:00,12:00")
+    REMINDER_TICK_MINUTES = int(os.getenv("REMINDER_TICK_MINUTES", 15))
+    REMINDER_DEFAULT_TIMEZONE = os.getenv("REMINDER_DEFAULT_TIMEZONE", "Asia/Kolkata")
+    # Parallel shard subtasks per reminder run (each covers a bucket range)
+    REMINDER_SHARDS = int(os.getenv("REMINDER_SHARDS", 4))
+    # Reminder offsets (days from the due date) for owners without their own rules
+    REMINDER_DEFAULT_OFFSETS = os.getenv("REMINDER_DEFAULT_OFFSETS", "-2,0,3")
+    # Oldest missed send date (in days) a run still catches up after an outage
+    REMINDER_CATCHUP_MAX_DAYS = int(os.getenv("REMINDER_CATCHUP_MAX_DAYS", 3))
+    # One reminder listing all unpaid months for tenants with several PENDING payments
+    REMINDER_CONSOLIDATE_ARREARS = os.getenv("REMINDER_CONSOLIDATE_ARREARS", "False").lower() in ["true", "1", "yes"]
+
+    # --- PAYMENTS ---
+    # Charge a tenancy starting mid-month only for the days it covers
+    PRORATE_PARTIAL_MONTHS = os.getenv("PRORATE_PARTIAL_MONTHS", "True").lower() in ["true", "1", "yes"]
+
+    # --- OWNER DIGEST ---
+    # Local hour (celery timezone) of the daily overdue / due-today digest email to owners
+    OWNER_DIGEST_HOUR = int(os.getenv("OWNER_DIGEST_HOUR", 8))
+
      # --- TWILIO ---
     TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
     TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
     TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
     TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER")
+    TWILIO_HTTP_POOL_SIZE = int(os.getenv("TWILIO_HTTP_POOL_SIZE", 10))
+    TWILIO_HTTP_TIMEOUT = float(os.getenv("TWILIO_HTTP_TIMEOUT", 10))
     
+    # --- NOTIFICATION TRANSPORT ---
+    # live: SMTP + Twilio, fake: record messages in-process (offline / load tests)
+    NOTIFICATION_TRANSPORT = os.getenv("NOTIFICATION_TRANSPORT", "live")
+    FAKE_TRANSPORT_LATENCY_MS = float(os.getenv("FAKE_TRANSPORT_LATENCY_MS", 0))
+    FAKE_TRANSPORT_JITTER_MS = float(os.getenv("FAKE_TRANSPORT_JITTER_MS", 0))
+    FAKE_TRANSPORT_ERROR_RATE = float(os.getenv("FAKE_TRANSPORT_ERROR_RATE", 0))
+    FAKE_TRANSPORT_RATE_LIMIT_RATE = float(os.getenv("FAKE_TRANSPORT_RATE_LIMIT_RATE", 0))
+    FAKE_TRANSPORT_SEED = int(os.getenv("FAKE_TRANSPORT_SEED", 42))
+
+    # --- OUTBOUND RATE LIMITS (shared token bucket per provider channel) ---
+    RATE_LIMITING_ENABLED = os.getenv("RATE_LIMITING_ENABLED", "True").lower() in ["true", "1", "yes"]
+    RATE_LIMIT_EMAIL_PER_SEC = float(os.getenv("RATE_LIMIT_EMAIL_PER_SEC", 5))
+    RATE_LIMIT_EMAIL_BURST = int(os.getenv("RATE_LIMIT_EMAIL_BURST", 5))
+    RATE_LIMIT_SMS_PER_SEC = float(os.getenv("RATE_LIMIT_SMS_PER_SEC", 1))
+    RATE_LIMIT_SMS_BURST = int(os.getenv("RATE_LIMIT_SMS_BURST", 1))
+    RATE_LIMIT_WHATSAPP_PER_SEC = float(os.getenv("RATE_LIMIT_WHATSAPP_PER_SEC", 20))
+    RATE_LIMIT_WHATSAPP_BURST = int(os.getenv("RATE_LIMIT_WHATSAPP_BURST", 20))
+    RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", 5))
+    RATE_LIMIT_BACKOFF_SECONDS = float(os.getenv("RATE_LIMIT_BACKOFF_SECONDS", 2))
+
      # --- JWT ---
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=15)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=1)
-    JWT_BLACKLIST_ENABLED = True
+    JWT_BLACKLIST_ENABLED = os.getenv("JWT_BLACKLIST_ENABLED", "True").lower() in ["true", "1", "yes"]
     JWT_BLACKLIST_TOKEN_CHECKS = ["access", "refresh"]
 
+    # --- METRICS ---
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "False").lower() in ["true", "1", "yes"]
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")  # when set, /metrics requires "Authorization: Bearer <token>"
+
+    # --- REQUEST PROFILING ---
+    REQUEST_PROFILING = os.getenv("REQUEST_PROFILING", "False").lower() in ["true", "1", "yes"]
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+    PROFILE_SLOW_REQUEST_MS = int(os.getenv("PROFILE_SLOW_REQUEST_MS", 500))
+    PROFILER = os.getenv("PROFILER", "cprofile")  # cprofile / pyinstrument
+    QUERY_BUDGET_ENFORCE = os.getenv("QUERY_BUDGET_ENFORCE", "False").lower() in ["true", "1", "yes"]
+    QUERY_BUDGET_DEFAULT = int(os.getenv("QUERY_BUDGET_DEFAULT")) if os.getenv("QUERY_BUDGET_DEFAULT") else None
+
     # --- FLASK ---
     SECRET_KEY = os.getenv("SECRET_KEY")
     ENV = os.getenv("FLASK_ENV", "production")
+
+
+# =====================================================
+# Celery execution profile (see celery_worker.py)
+# =====================================================
+
+class CeleryConfig:
+    broker_url = Config.REDIS_URL
+    result_backend = Config.REDIS_URL
+    task_always_eager = _env_bool("CELERY_TASK_ALWAYS_EAGER", "False")
+
+    # I/O-bound sends go to a thread/gevent pool, DB-heavy batch work to prefork.
+    task_default_queue = "default"
+    task_routes = {
+        "app.tasks.dispatch_notifications": {"queue": "notifications"},
+        "app.tasks.generate_monthly_payments": {"queue": "batch"},
+        "app.tasks.send_rent_reminder_shard": {"queue": "batch"},
+        "app.tasks.send_owner_digests": {"queue": "notifications"},
+    }
+
+    # Long tasks: take one message at a time and acknowledge after it finishes,
+    # so a killed worker's task is redelivered instead of lost. Redelivery is
+    # only safe for idempotent tasks (payment dedup, outbox keys); a task that
+    # sends directly, like send_owner_digests, must opt out with acks_late=False.
+    worker_prefetch_multiplier = int(os.getenv("CELERY_PREFETCH_MULTIPLIER", 1))
+    task_acks_late = _env_bool("CELERY_ACKS_LATE", "True")
+    task_reject_on_worker_lost = True
+    # Must exceed the longest task plus its retry countdown, or Redis redelivers it while still running.
+    broker_transport_options = {
+        "visibility_timeout": int(os.getenv("CELERY_VISIBILITY_TIMEOUT", 7200)),
+    }
+
+    # Nothing reads task results except chords; those tasks opt back in.
+    task_ignore_result = True
+    result_expires = int(os.getenv("CELERY_RESULT_EXPIRES", 3600))
+    worker_max_tasks_per_child = int(os.getenv("CELERY_MAX_TASKS_PER_CHILD", 1000))
+
+    # Beat schedule state lives in Redis (celery-redbeat) instead of the local
+    # celerybeat-schedule file. A Redis lock keeps exactly one of several beat
+    # replicas active; a standby takes over once the lock times out.
+    beat_scheduler = os.getenv("CELERY_BEAT_SCHEDULER", "redbeat.RedBeatScheduler")
+    redbeat_redis_url = Config.REDIS_URL
+    beat_max_loop_interval = int(os.getenv("CELERY_BEAT_MAX_LOOP_INTERVAL", 30))
+    redbeat_lock_timeout = int(os.getenv("REDBEAT_LOCK_TIMEOUT", 150))
@@ -3,6 +3,7 @@ from datetime import datetime, date
 from sqlalchemy.dialects.postgresql import UUID
 import uuid, enum
 from sqlalchemy import Enum
+from app.utils.reminder_slots import reminder_bucket
 
 class TimeStamp:
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -35,6 +36,7 @@ class User(db.Model, TimeStamp):
     contact = db.Column(db.String(15))
     password = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(20), default="OWNER")  # OWNER / TENANT
+    timezone = db.Column(db.String(50))  # IANA name; NULL = REMINDER_DEFAULT_TIMEZONE
 
     properties = db.relationship("Property", backref="owner", lazy=True, cascade="all, delete-orphan")
     password_reset_tokens = db.relationship("PasswordResetToken",backref="user",cascade="all, delete-orphan",lazy=True)
@@ -47,6 +49,13 @@ class User(db.Model, TimeStamp):
 
 class Tenant(db.Model, TimeStamp):
     __tablename__ = "tenants"
+    __table_args__ = (
+        # Reminder shards read live tenancies in a bucket range.
+        db.Index("ix_tenants_active_bucket", "is_active", "reminder_bucket"),
+        # Tenant lists sort and filter on the payment rollups.
+        db.Index("ix_tenants_outstanding_balance", "outstanding_balance"),
+        db.Index("ix_tenants_next_due_date", "next_due_date"),
+    )
 
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     property_id = db.Column(UUID(as_uuid=True), db.ForeignKey("properties.id"), nullable=False)
@@ -62,6 +71,16 @@ class Tenant(db.Model, TimeStamp):
     start_date = db.Column(db.Date, default=date.today)
     is_active = db.Column(db.Boolean, default=True)
 
+    # Comma separated reminder channels, e.g. "EMAIL,SMS". NULL = DEFAULT_REMINDER_CHANNELS.
+    notify_channels = db.Column(db.String(50))
+    # Hash of the id; decides which reminder slot handles this tenant.
+    reminder_bucket = db.Column(db.Integer)
+
+    # Rollups of PENDING payments, maintained by refresh_tenant_rollups().
+    outstanding_balance = db.Column(db.Numeric(12, 2), default=0, server_default="0", nullable=False)
+    oldest_unpaid_month = db.Column(db.String(7))  # NULL = nothing unpaid
+    next_due_date = db.Column(db.Date)  # due date of the oldest unpaid payment
+
     payments = db.relationship(
         "Payment",
         backref="tenant",
@@ -69,6 +88,14 @@ class Tenant(db.Model, TimeStamp):
         lazy=True
     )
 
+
+@db.event.listens_for(Tenant, "before_insert")
+def _assign_reminder_bucket(mapper, connection, tenant):
+    if tenant.id is None:
+        tenant.id = uuid.uuid4()
+    if tenant.reminder_bucket is None:
+        tenant.reminder_bucket = reminder_bucket(tenant.id)
+
 # class Tenant(db.Model, TimeStamp):
 #     __tablename__ = "tenants"
 
@@ -152,6 +179,39 @@ class ReminderLog(db.Model, TimeStamp):
 
     # payment = db.relationship("Payment", backref="reminders")
 
+
+class ReminderRule(db.Model, TimeStamp):
+    """One reminder an owner wants per payment, ``offset_days`` from the due date."""
+    __tablename__ = "reminder_rules"
+    __table_args__ = (db.UniqueConstraint("owner_id", "offset_days", name="uq_reminder_rule_owner_offset"),)
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    owner_id = db.Column(UUID(as_uuid=True), db.ForeignKey("users.id"), nullable=False, index=True)
+    offset_days = db.Column(db.Integer, nullable=False)  # -2 = two days before, 3 = three days after
+
+
+class ReminderSchedule(db.Model, TimeStamp):
+    """A reminder expanded from the owner's rules for one payment."""
+    __tablename__ = "reminder_schedule"
+    __table_args__ = (
+        db.UniqueConstraint("payment_id", "reminder_type", name="uq_reminder_schedule_payment_type"),
+        # The daily job reads only open rows up to today.
+        db.Index(
+            "ix_reminder_schedule_open_send_on",
+            "send_on",
+            postgresql_where=db.text("processed_at IS NULL"),
+            sqlite_where=db.text("processed_at IS NULL"),
+        ),
+    )
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    payment_id = db.Column(UUID(as_uuid=True), db.ForeignKey("payments.id"), nullable=False)
+
+    reminder_type = db.Column(db.String(20), nullable=False)  # BEFORE / ON / AFTER, or e.g. AFTER+7
+    due_on = db.Column(db.Date, nullable=False)
+    send_on = db.Column(db.Date, nullable=False)
+    processed_at = db.Column(db.DateTime)  # enqueued, superseded or closed
+
 # class RentReminder(db.Model, TimeStamp):
 #     __tablename__ = "rent_reminders"
 
@@ -168,10 +228,14 @@ class ReminderLog(db.Model, TimeStamp):
 class PaymentStatus(enum.Enum):
     PENDING = "PENDING"
     PAID = "PAID"
+    CANCELLED = "CANCELLED"  # future month of a tenancy that ended
 
 class Payment(db.Model, TimeStamp):
     __tablename__ = "payments"
-    __table_args__ = (db.UniqueConstraint("tenant_id","month",name="uq_tenant_month"),)
+    __table_args__ = (
+        db.UniqueConstraint("tenant_id","month",name="uq_tenant_month"),
+        db.Index("ix_payments_status_month", "status", "month"),
+    )
 
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     tenant_id = db.Column(UUID(as_uuid=True), db.ForeignKey("tenants.id"), nullable=False)
@@ -190,7 +254,47 @@ class Payment(db.Model, TimeStamp):
         cascade="all, delete-orphan",
         lazy=True
     )
-    
+
+    notifications = db.relationship(
+        "NotificationOutbox",
+        backref="payment",
+        cascade="all, delete-orphan",
+        lazy=True
+    )
+
+    reminder_schedule = db.relationship(
+        "ReminderSchedule",
+        backref="payment",
+        cascade="all, delete-orphan",
+        lazy=True
+    )
+
+
+# ---------------------------
+# Notification Outbox
+# ---------------------------
+class NotificationOutbox(db.Model, TimeStamp):
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        # Idempotency key: one intent per payment, reminder type and channel.
+        db.UniqueConstraint("payment_id", "reminder_type", "channel", name="uq_outbox_payment_type_channel"),
+        db.Index("ix_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    payment_id = db.Column(UUID(as_uuid=True), db.ForeignKey("payments.id"), nullable=False)
+
+    reminder_type = db.Column(db.String(20), nullable=False)  # BEFORE / ON / AFTER
+    channel = db.Column(db.String(20), nullable=False)        # EMAIL / SMS / WHATSAPP
+
+    status = db.Column(db.String(20), nullable=False, default="PENDING")  # PENDING / SENDING / SENT / FAILED
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    # Earliest next delivery attempt; while SENDING, the end of the claim lease.
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+    provider_id = db.Column(db.String(64))
+    sent_at = db.Column(db.DateTime)
+
 
 # class RentPayment(db.Model, TimeStamp):
 #     __tablename__ = "rent_payments"
@@ -222,6 +326,23 @@ class Payment(db.Model, TimeStamp):
 # Tasks Log (Optional)
 # ---------------------------
 
+class TaskRun(db.Model, TimeStamp):
+    __tablename__ = "task_runs"
+    __table_args__ = (db.Index("ix_task_runs_task_started", "task_name", "started_at"),)
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    task_name = db.Column(db.String(100), nullable=False)
+    task_id = db.Column(db.String(50))
+
+    status = db.Column(db.String(20))          # SUCCESS / FAILED
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    duration_ms = db.Column(db.Float)
+
+    stages = db.Column(db.JSON)                # {"query": 12.5, "send_email": 830.1, ...} in ms
+    counts = db.Column(db.JSON)                # {"scanned": 120, "sent": 14, ...}
+    send_p50_ms = db.Column(db.Float)
+    send_p99_ms = db.Column(db.Float)
+
 # class DailyTaskLog(db.Model):
 #     __tablename__ = "daily_task_log"
 
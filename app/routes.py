@@ -1,8 +1,12 @@
-from flask import Blueprint, jsonify, current_app
+import hmac
+
+from flask import Blueprint, Response, jsonify, current_app, abort, request
 from app import db
+from app.utils.metrics import registry
+from app.utils.profiling import query_budget
 from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token, get_jwt
 # from app.tasks import send_rent_notifications_task, test_celery_task
-from app.utils.controller import AuthController, TenantController, PropertyController, PaymentController, DashboardController
+from app.utils.controller import AuthController, TenantController, PropertyController, PaymentController, DashboardController, ReminderRuleController
 
 api = Blueprint("api", __name__)
 
@@ -26,6 +30,15 @@ def smtp_test():
     except Exception as e:
         return jsonify({"status": "failed", "error": str(e)}), 500   
 
+@api.route("/metrics")
+def metrics():
+    if not current_app.config.get("METRICS_ENABLED"):
+        abort(404)
+    token = current_app.config.get("METRICS_TOKEN")
+    if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        abort(401)
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
 # @api.route('/test-celery', methods=['GET'])
 # def test_celery():
 #     """
@@ -124,6 +137,7 @@ def delete_tenant(tenant_id):
     
 @api.route("/tenants", methods=["GET"])
 @jwt_required()
+@query_budget(2)
 def get_tenants():
         tenants = TenantController()
         getTenants = tenants.get_all_tenants()
@@ -132,6 +146,7 @@ def get_tenants():
 
 @api.route("/tenant-detail/<uuid:tenant_id>", methods=["GET"])
 @jwt_required()
+@query_budget(2)
 def tenant_detail(tenant_id):
     return TenantController().get_tenant_detail(tenant_id)
     
@@ -207,6 +222,7 @@ def pending_summary():
 
 @api.route("/tenant-payments/<uuid:tenant_id>", methods=["GET"])
 @jwt_required()
+@query_budget(1)
 def tenant_payments(tenant_id):
         controller = PaymentController()
         return controller.get_tenant_payments(tenant_id)
@@ -228,17 +244,37 @@ def dashboard_summary():
 
 @api.route("/overdue", methods=["GET"])
 @jwt_required()
+@query_budget(1)
 def overdue_payments():
         controller = DashboardController()
         return controller.get_overdue_payments()
+
+
+@api.route("/overdue/aging", methods=["GET"])
+@jwt_required()
+@query_budget(1)
+def overdue_aging():
+        controller = DashboardController()
+        return controller.get_overdue_aging()
     
 
 @api.route("/payments", methods=["GET"])
 @jwt_required()
+@query_budget(1)
 def monthly_payments():
         controller = DashboardController()
         return controller.get_monthly_payments()
 
 
+@api.route("/reminder-rules", methods=["GET"])
+@jwt_required()
+def get_reminder_rules():
+        controller = ReminderRuleController()
+        return controller.get_rules()
 
 
+@api.route("/reminder-rules", methods=["PUT"])
+@jwt_required()
+def update_reminder_rules():
+        controller = ReminderRuleController()
+        return controller.update_rules()
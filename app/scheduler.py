@@ -1,15 +1,34 @@
 from celery.schedules import crontab
 from app import celery
+from app.config import Config
 
 # ✅ Set timezone for India
 celery.conf.timezone = "Asia/Kolkata"
 celery.conf.enable_utc = False  # ensure local time (important!)
 
 celery.conf.beat_schedule = {
-#     # Daily reminder check (runs every day at 9 AM)
-    "send-rent-reminders-daily": {
-        "task": "app.tasks.send_rent_reminders",
-        "schedule": crontab(hour=9, minute=0),
+    # Reminder slots: each tick fires the slots starting now in any owner time zone
+    "schedule-reminder-slots": {
+        "task": "app.tasks.schedule_reminder_slots",
+        "schedule": crontab(minute=f"*/{Config.REMINDER_TICK_MINUTES}"),
+    },
+
+    # Drain the notification outbox (retries, leftovers from crashed dispatchers)
+    "dispatch-notification-outbox": {
+        "task": "app.tasks.dispatch_notifications",
+        "schedule": crontab(),
+    },
+
+    # Daily digest of overdue and due-today tenants for every owner
+    "send-owner-digests": {
+        "task": "app.tasks.send_owner_digests",
+        "schedule": crontab(hour=Config.OWNER_DIGEST_HOUR, minute=0),
+    },
+
+    # Drop persisted task runs past TASK_RUN_RETENTION_DAYS
+    "prune-task-runs": {
+        "task": "app.tasks.prune_old_task_runs",
+        "schedule": crontab(hour=3, minute=30),
     },
 
     # Monthly payment generation (1st of every month)
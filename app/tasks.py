@@ -1,45 +1,52 @@
+from celery import chord, group
 from app import celery, db
-from app.models import Tenant, Payment, ReminderLog, PaymentStatus
+from app.models import Tenant, Payment, PaymentStatus, Property, ReminderSchedule, User
 from flask import current_app
-from datetime import date, timedelta
-from app.utils.helper import EmailHelper
-from calendar import monthrange
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+from sqlalchemy import func, or_
+from sqlalchemy.orm import contains_eager
+from app.utils.reminder_schedule import close_schedule, consolidate_arrears, expand_schedule
+from app.utils.reminder_slots import SHARD_BUCKETS, bucket_range, due_slots, parse_slots, split_range
+from app.utils.message_templates import render_message
+from app.utils.owner_digest import owner_digests
+from app.utils.payments import materialize_payments, refresh_tenant_rollups
+from app.utils.outbox import claim_batch, deliver_many, enqueue, existing_intents, mark_failed, mark_sent, mark_skipped, reminder_channels, render
+from app.utils.task_lock import singleton
+from app.utils.task_metrics import TaskRunRecorder, prune_task_runs
+from app.utils.transport import TransportError, email_batch
 
 @celery.task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3, "countdown": 30})
+@singleton()
 def generate_monthly_payments(self):
+    recorder = TaskRunRecorder("generate_monthly_payments", self.request.id)
     try:
         today = date.today()
         month_str = today.strftime("%Y-%m")  # e.g. 2026-01
 
-        tenants = Tenant.query.filter_by(is_active=True).all()
-        created = 0
+        # Tenants added or reactivated this month already have their payment.
+        with recorder.stage("materialize"):
+            created = materialize_payments(month_str)
 
-        for tenant in tenants:
-            exists = Payment.query.filter_by(
-                tenant_id=tenant.id,
-                month=month_str
-            ).first()
+        # Every tenant at once; also repairs any rollup that drifted.
+        with recorder.stage("rollups"):
+            refresh_tenant_rollups()
 
-            if exists:
-                continue
+        with recorder.stage("commit"):
+            db.session.commit()
+        recorder.count("created", created)
 
-            payment = Payment(
-                tenant_id=tenant.id,
-                month=month_str,
-                rent_amount=tenant.rent_amount,
-                maintenance_amount=tenant.maintenance_amount,
-                status=PaymentStatus.PENDING
-            )
-
-            db.session.add(payment)
-            created += 1
-
-        db.session.commit()
+        # Expand owner reminder rules for this month's payments (idempotent).
+        with recorder.stage("schedule"):
+            scheduled = expand_schedule(Payment.month == month_str)
+            db.session.commit()
+        recorder.count("scheduled", scheduled)
 
         current_app.logger.info(
             f"Monthly payments generated for {month_str}: {created}"
         )
 
+        recorder.finish()
         return {"month": month_str, "created": created}
 
     except Exception:
@@ -47,96 +54,314 @@ def generate_monthly_payments(self):
         current_app.logger.exception(
             "Monthly payment generation failed"
         )
+        recorder.finish("FAILED")
         raise
 
-@celery.task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3, "countdown": 60})
-def send_rent_reminders(self):
-    try:
-        today = date.today()
-        email_helper = EmailHelper()
+@celery.task
+def send_rent_reminders(slot=None, slot_count=None, timezone=None, shards=None):
+    """Fan reminder work out to shard subtasks and aggregate them in a chord callback.
 
-        payments = (
-            Payment.query
-            .join(Tenant)
-            .filter(Payment.status == PaymentStatus.PENDING)
-            .all()
-        )
+    With ``slot``/``slot_count`` only that slot's tenant partition is handled,
+    and with ``timezone`` only tenants of owners in that zone (using their
+    local date). Without arguments every tenant is handled. The partition is
+    split into ``shards`` (default REMINDER_SHARDS) bucket ranges.
+    """
+    if slot is not None:
+        lo, hi = bucket_range(slot, slot_count)
+    else:
+        lo, hi = 0, SHARD_BUCKETS
 
-        sent_count = 0
+    ranges = split_range(lo, hi, shards or current_app.config.get("REMINDER_SHARDS", 4))
 
-        for payment in payments:
-            tenant = payment.tenant
-            if not tenant or not tenant.due_day:
-                continue
+    header = group(send_rent_reminder_shard.s(start, end, timezone) for start, end in ranges)
+    result = chord(header)(
+        finish_rent_reminders.s(slot=slot, slot_count=slot_count, timezone=timezone)
+    )
 
-            # Parse payment month safely
-            try:
-                year, month = map(int, payment.month.split("-"))
-                last_day = monthrange(year, month)[1]
+    return {"shards": len(ranges), "callback_id": result.id}
 
-                due_day = min(
-                    tenant.due_day,
-                    last_day
-                )
 
-                due_date = date(
-                    year,
-                    month,
-                    due_day
+@celery.task(bind=True, ignore_result=False, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3, "countdown": 60})
+@singleton(key=lambda bucket_start, bucket_end, timezone=None: f"{bucket_start}-{bucket_end}:{timezone or '*'}")
+def send_rent_reminder_shard(self, bucket_start, bucket_end, timezone=None):
+    """Enqueue due reminders for tenants in [bucket_start, bucket_end) from reminder_schedule.
+
+    Reads open schedule rows with send_on <= today (an index range scan), so
+    the cost does not depend on how many rules or payments exist. Rows missed
+    during an outage are still open and get caught up, back to
+    REMINDER_CATCHUP_MAX_DAYS; when several are open for one payment only the
+    latest is sent. Every row read is marked processed in the same commit as
+    the outbox intents.
+
+    Shards are independent: a failed shard retries on its own. Nothing is
+    sent here, so a retry only re-derives intents; the outbox idempotency key
+    makes re-inserting them a no-op.
+    """
+    recorder = TaskRunRecorder("send_rent_reminder_shard", self.request.id)
+    try:
+        today = datetime.now(ZoneInfo(timezone)).date() if timezone else date.today()
+        cutoff = today - timedelta(days=current_app.config.get("REMINDER_CATCHUP_MAX_DAYS", 3))
+
+        with recorder.stage("query"):
+            query = (
+                ReminderSchedule.query
+                .join(Payment, ReminderSchedule.payment_id == Payment.id)
+                .join(Tenant, Payment.tenant_id == Tenant.id)
+                .options(contains_eager(ReminderSchedule.payment).contains_eager(Payment.tenant))
+                .filter(
+                    ReminderSchedule.processed_at.is_(None),
+                    ReminderSchedule.send_on <= today,
+                    Payment.status == PaymentStatus.PENDING,
+                    Tenant.is_active.is_(True)
                 )
-            except Exception:
-                current_app.logger.warning(
-                    f"Invalid due date for tenant {tenant.id}"
+            )
+
+            in_range = (Tenant.reminder_bucket >= bucket_start) & (Tenant.reminder_bucket < bucket_end)
+            # Tenants created before bucketing have no bucket yet: the first shard owns them.
+            query = query.filter(or_(in_range, Tenant.reminder_bucket.is_(None)) if bucket_start == 0 else in_range)
+
+            if timezone is not None:
+                owner_timezone = func.coalesce(User.timezone, current_app.config["REMINDER_DEFAULT_TIMEZONE"])
+                query = (
+                    query
+                    .join(Property, Tenant.property_id == Property.id)
+                    .join(User, Property.owner_id == User.id)
+                    .filter(owner_timezone == timezone)
                 )
-                continue
-
-            # Determine reminder type
-            if today == due_date - timedelta(days=2):
-                reminder_type = "BEFORE"
-            elif today == due_date:
-                reminder_type = "ON"
-            elif today == due_date + timedelta(days=3):
-                reminder_type = "AFTER"
-            else:
-                continue
-
-            # Avoid duplicate reminders
-            exists = ReminderLog.query.filter_by(
-                payment_id=payment.id,
-                reminder_type=reminder_type
-            ).first()
-
-            if exists:
-                continue
-
-            # -------------------
-            # EMAIL REMINDER
-            # -------------------
-            if tenant.email:
-                email_helper.send_rent_email(
-                    tenant=tenant,
-                    payment=payment,
-                    reminder_type=reminder_type
+
+            rows = query.order_by(ReminderSchedule.send_on).all()
+        recorder.count("scanned", len(rows))
+
+        with recorder.stage("select"):
+            # Latest open reminder per payment; earlier ones are superseded.
+            latest = {}
+            for row in rows:
+                latest[row.payment_id] = row
+
+            selected = []
+            for row in latest.values():
+                if row.send_on < cutoff:
+                    recorder.count("stale")
+                    continue
+                # A "before" reminder is pointless once the due date has passed.
+                if row.send_on < row.due_on < today:
+                    recorder.count("stale")
+                    continue
+                selected.append(row)
+
+        if current_app.config.get("REMINDER_CONSOLIDATE_ARREARS"):
+            with recorder.stage("consolidate"):
+                selected = consolidate_arrears(selected)
+        else:
+            selected = [(row, row.reminder_type) for row in selected]
+
+        due = []
+        for row, reminder_type in selected:
+            for channel in reminder_channels(row.payment.tenant):
+                due.append((row.payment_id, reminder_type, channel))
+        recorder.count("due", len(due))
+
+        # Avoid duplicate reminders
+        with recorder.stage("dedup"):
+            existing = existing_intents(due)
+
+        intents = [
+            {"payment_id": payment_id, "reminder_type": reminder_type, "channel": channel}
+            for payment_id, reminder_type, channel in due
+            if (payment_id, reminder_type, channel) not in existing
+        ]
+
+        with recorder.stage("enqueue"):
+            enqueued = enqueue(intents)
+            close_schedule(ReminderSchedule.id.in_([row.id for row in rows]))
+
+        with recorder.stage("commit"):
+            db.session.commit()
+        recorder.count("enqueued", enqueued)
+
+        recorder.finish()
+        return {"scanned": len(rows), "due": len(due), "enqueued": enqueued}
+
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception(
+            f"Rent reminder shard [{bucket_start}, {bucket_end}) failed"
+        )
+        recorder.finish("FAILED")
+        raise
+
+
+@celery.task
+def finish_rent_reminders(results, slot=None, slot_count=None, timezone=None):
+    """Chord callback: sum the shard counts and start dispatching the outbox."""
+    totals = {}
+    for result in results:
+        for key, value in result.items():
+            totals[key] = totals.get(key, 0) + value
+
+    current_app.logger.info(
+        "Rent reminders enqueued"
+        + (f" (slot {slot + 1}/{slot_count})" if slot is not None else "")
+        + (f" [{timezone}]" if timezone else "")
+        + f" across {len(results)} shards: {totals}"
+    )
+
+    if totals.get("enqueued"):
+        for _ in range(current_app.config.get("OUTBOX_DISPATCHERS", 1)):
+            dispatch_notifications.delay()
+
+    return totals
+
+
+@celery.task
+def schedule_reminder_slots():
+    """Beat tick: start send_rent_reminders for every slot beginning now.
+
+    Each owner time zone in use gets its own run per slot, so reminders go out
+    at the slot's local time and the day's load is split across the slots.
+    """
+    config = current_app.config
+    slots = parse_slots(config["REMINDER_SLOTS"])
+    default_timezone = config["REMINDER_DEFAULT_TIMEZONE"]
+
+    timezones = {
+        row[0] or default_timezone
+        for row in db.session.query(User.timezone).distinct()
+    }
+
+    fired = due_slots(timezones, slots, config["REMINDER_TICK_MINUTES"])
+    for timezone, slot in fired:
+        send_rent_reminders.delay(slot=slot, slot_count=len(slots), timezone=timezone)
+
+    return {"fired": len(fired)}
+
+
+@celery.task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3, "countdown": 30})
+def dispatch_notifications(self):
+    """Drain due outbox intents: send each one and mark it sent or retry it later.
+
+    Several dispatchers may run at once; each claims its own batches. Within a
+    batch, every channel is sent concurrently on its own thread pool.
+    """
+    recorder = TaskRunRecorder("dispatch_notifications", self.request.id)
+    config = current_app.config
+    sent = failed = 0
+
+    try:
+        while True:
+            with recorder.stage("claim"):
+                batch = claim_batch(
+                    config.get("OUTBOX_BATCH_SIZE", 100),
+                    config.get("OUTBOX_LEASE_SECONDS", 300)
                 )
+            if not batch:
+                break
 
-                db.session.add(ReminderLog(
-                    payment_id=payment.id,
-                    reminder_type=reminder_type,
-                    sent_via="EMAIL"
-                ))
+            jobs = []
+            covered = {}
+            with recorder.stage("render"):
+                for intent in batch:
+                    rendered = render(intent)
+                    if rendered is None:
+                        mark_skipped(intent, f"No {intent.channel} recipient, tenant inactive or payment settled")
+                        recorder.count("skipped")
+                    else:
+                        jobs.append((intent, rendered.recipient, rendered.subject, rendered.body))
+                        covered[intent.id] = rendered.payment_ids
 
-                sent_count += 1
+            for intent, provider_id, error in deliver_many(jobs, recorder):
+                if error is not None:
+                    current_app.logger.warning(
+                        f"{intent.channel} {intent.reminder_type} reminder failed for payment {intent.payment_id}: {error}"
+                    )
+                    mark_failed(intent, error)
+                    failed += 1
+                else:
+                    mark_sent(intent, provider_id, covered[intent.id])
+                    sent += 1
 
-            current_app.logger.info(
-                f"{reminder_type} reminder sent to {tenant.name}"
-            )
+                # Commit per message so a crash never forgets a completed send.
+                with recorder.stage("commit"):
+                    db.session.commit()
+
+            # Rows skipped at render time
+            db.session.commit()
+
+        recorder.count("sent", sent)
+        recorder.count("failed", failed)
+
+        current_app.logger.info(
+            f"Notification outbox drained: {sent} sent, {failed} failed"
+        )
+
+        recorder.finish()
+        return {"sent": sent, "failed": failed}
+
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception(
+            "Notification dispatch failed"
+        )
+        recorder.finish("FAILED")
+        raise
+
+
+@celery.task(bind=True, acks_late=False)
+@singleton()
+def send_owner_digests(self):
+    """Email every owner one digest of their overdue and due-today tenants.
+
+    Not retried or redelivered: either would resend digests that already went
+    out, so the message is acknowledged on receipt (overriding the global
+    acks_late). Failed owners are logged and counted instead.
+    """
+    recorder = TaskRunRecorder("send_owner_digests", self.request.id)
+    sent = failed = 0
+
+    try:
+        today = date.today()
+
+        with recorder.stage("query"):
+            digests = owner_digests(today)
+        recorder.count("owners", len(digests))
 
-        db.session.commit()
-        return {"sent": sent_count}
+        with recorder.stage("render"):
+            messages = [
+                (digest["email"], render_message("owner_digest", "EMAIL", **digest))
+                for digest in digests
+            ]
+
+        with email_batch() as transport:
+            for email, message in messages:
+                try:
+                    with recorder.send("EMAIL"):
+                        transport.send(to=email, body=message.body, subject=message.subject)
+                    sent += 1
+                except TransportError as e:
+                    current_app.logger.warning(f"Owner digest to {email} failed: {e}")
+                    failed += 1
+
+        recorder.count("sent", sent)
+        recorder.count("failed", failed)
+
+        current_app.logger.info(
+            f"Owner digests for {today}: {sent} sent, {failed} failed"
+        )
+
+        recorder.finish()
+        return {"sent": sent, "failed": failed}
 
     except Exception:
         db.session.rollback()
         current_app.logger.exception(
-            "Rent reminder task failed"
+            "Owner digest run failed"
         )
-        raise
\ No newline at end of file
+        recorder.finish("FAILED")
+        raise
+
+
+@celery.task
+def prune_old_task_runs():
+    deleted = prune_task_runs(current_app.config.get("TASK_RUN_RETENTION_DAYS", 14))
+    current_app.logger.info(f"Pruned {deleted} task runs")
+    return {"deleted": deleted}
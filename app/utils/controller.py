@@ -1,13 +1,19 @@
-from app.models import User, PasswordResetToken , Tenant, Property, Payment
-from app.utils.helper import AuthHelper, send_welcome_notifications_async, send_tenant_notifications_async
+from app.models import User, PasswordResetToken , Tenant, Property, Payment, ReminderRule, ReminderSchedule
+from app.utils.helper import AuthHelper, current_user_id, send_welcome_notifications_async, send_tenant_notifications_async
+from app.utils.db_routing import read_only
+from app.utils.due_dates import AGING_BUCKETS, aging_bucket_expr, days_overdue_expr, due_date_expr
+from app.utils.outbox import parse_channels
+from app.utils.payments import materialize_payments, refresh_tenant_rollups
+from app.utils.reminder_schedule import close_out_tenant, close_schedule, default_offsets, expand_schedule, reopen_tenant, reschedule_owner, reschedule_tenant
+from app.utils.reminder_slots import MAX_OFFSET, MIN_OFFSET, is_valid_timezone
 from app import db, mail
 from flask_mail import Message
 from flask import Blueprint, request, jsonify, url_for, current_app
 import secrets, re
 from datetime import datetime, timedelta, date
-from flask_jwt_extended import get_jwt_identity
 from app.models import PaymentStatus
 from calendar import monthrange
+from sqlalchemy import case, func
 from threading import Thread
 # from app.utils.helper import TwilioHelper
 
@@ -27,6 +33,7 @@ class AuthController:
             contact = data.get("contact", "").strip()
             password = data.get("password", "")
             role = data.get("role", "OWNER")
+            timezone = (data.get("timezone") or "").strip() or None
 
             # -------- Validation --------
             if not all([username, email, contact, password]):
@@ -43,6 +50,9 @@ class AuthController:
             if not re.match(r"^(?:\+91|0)?[6-9]\d{9}$", contact):
                 return jsonify({"error": "Invalid phone number format"}), 400
 
+            if timezone and not is_valid_timezone(timezone):
+                return jsonify({"error": "Invalid timezone"}), 400
+
             if (
                 len(password) < 8
                 or not any(c.isupper() for c in password)
@@ -69,7 +79,8 @@ class AuthController:
                 email=email,
                 contact=contact,
                 password=self.auth_helper.hash_password(password),
-                role=role
+                role=role,
+                timezone=timezone
             )
 
             db.session.add(new_user)
@@ -247,7 +258,7 @@ class AuthController:
         
     def change_password(self):
         try:
-            user_id = get_jwt_identity()
+            user_id = current_user_id()
 
             old_password = (self.data.get("old_password") or "").strip()
             new_password = (self.data.get("new_password") or "").strip()
@@ -296,7 +307,7 @@ class TenantController:
 
     def __init__(self):
         self.data = request.get_json(silent=True) or request.form
-        self.user_id = get_jwt_identity()
+        self.user_id = current_user_id()
 
     # ---------------- ADD TENANT ----------------
     def add_tenant(self):
@@ -386,6 +397,14 @@ class TenantController:
             else:
                 start_date = date.today()
 
+            # ---------------- Reminder Channels ----------------
+            try:
+                notify_channels = parse_channels(self.data.get("notify_channels"))
+            except ValueError as e:
+                return jsonify({
+                    "error": str(e)
+                }), 400
+
             # ---------------- Verify Property Ownership ----------------
             property_obj = Property.query.filter_by(
                 name=property_name,
@@ -422,10 +441,19 @@ class TenantController:
                 maintenance_amount=maintenance_amount,
                 due_day=due_day,
                 start_date=start_date,
-                is_active=True
+                is_active=True,
+                notify_channels=notify_channels
             )
 
             db.session.add(tenant)
+            db.session.flush()
+
+            # This month's payment now, instead of waiting for the monthly run
+            today = date.today()
+            materialize_payments(today.strftime("%Y-%m"), Tenant.id == tenant.id)
+            expand_schedule(Payment.tenant_id == tenant.id, send_from=today)
+            refresh_tenant_rollups(Tenant.id == tenant.id)
+
             db.session.commit()
 
             current_app.logger.info(
@@ -458,7 +486,8 @@ class TenantController:
                     "maintenance_amount": tenant.maintenance_amount,
                     "due_day": tenant.due_day,
                     "start_date": tenant.start_date.isoformat(),
-                    "is_active": tenant.is_active
+                    "is_active": tenant.is_active,
+                    "notify_channels": tenant.notify_channels
                 }
             }), 201
 
@@ -609,19 +638,43 @@ class TenantController:
                         "error": "Invalid start_date format. Use YYYY-MM-DD."
                     }), 400
 
+            # ---------------- Reminder Channels ----------------
+            if "notify_channels" in self.data:
+                try:
+                    tenant.notify_channels = parse_channels(self.data.get("notify_channels"))
+                except ValueError as e:
+                    return jsonify({
+                        "error": str(e)
+                    }), 400
+
             # ---------------- Active Status ----------------
             if "is_active" in self.data:
                 value = str(self.data.get("is_active")).lower()
 
                 if value in ["true", "1", "yes"]:
-                    tenant.is_active = True
+                    if not tenant.is_active:
+                        tenant.is_active = True
+                        db.session.flush()
+                        materialize_payments(date.today().strftime("%Y-%m"), Tenant.id == tenant.id)
+                        reopen_tenant(tenant.id)
+                        refresh_tenant_rollups(Tenant.id == tenant.id)
                 elif value in ["false", "0", "no"]:
+                    if tenant.is_active:
+                        close_out_tenant(tenant.id)
                     tenant.is_active = False
                 else:
                     return jsonify({
                         "error": "Invalid value for is_active."
                     }), 400
 
+            # Reminder dates and the next due date follow the due day (and the
+            # start date, which may push back a first month's due date).
+            if "due_day" in self.data or "start_date" in self.data:
+                db.session.flush()
+                if tenant.is_active:
+                    reschedule_tenant(tenant.id)
+                refresh_tenant_rollups(Tenant.id == tenant.id)
+
             db.session.commit()
 
             current_app.logger.info(
@@ -639,7 +692,8 @@ class TenantController:
                     "maintenance_amount": tenant.maintenance_amount,
                     "due_day": tenant.due_day,
                     "start_date": tenant.start_date.isoformat() if tenant.start_date else None,
-                    "is_active": tenant.is_active
+                    "is_active": tenant.is_active,
+                    "notify_channels": tenant.notify_channels
                 }
             }), 200
 
@@ -671,11 +725,12 @@ class TenantController:
 
             # Soft Delete
             tenant.is_active = False
+            cancelled = close_out_tenant(tenant.id)
 
             db.session.commit()
 
             current_app.logger.info(
-                f"Tenant {tenant.id} marked inactive by user {self.user_id}"
+                f"Tenant {tenant.id} marked inactive by user {self.user_id} ({cancelled} future payments cancelled)"
             )
 
             return jsonify({
@@ -691,6 +746,7 @@ class TenantController:
         
 
     # ---------------- GET ALL TENANTS ----------------
+    @read_only
     def get_all_tenants(self):
         try:
             # --- Pagination ---
@@ -698,6 +754,19 @@ class TenantController:
             per_page = int(request.args.get("per_page", 10))
             search = (request.args.get("search") or "").strip()
             status_filter = request.args.get("status")  # Active / Inactive (optional)
+            sort = request.args.get("sort", "created_at")
+            order = request.args.get("order", "desc")
+
+            sort_columns = {
+                "created_at": Tenant.created_at,
+                "balance": Tenant.outstanding_balance,
+                "next_due_date": Tenant.next_due_date,
+                "oldest_unpaid_month": Tenant.oldest_unpaid_month,
+            }
+            if sort not in sort_columns or order not in ("asc", "desc"):
+                return jsonify({
+                    "error": f"sort must be one of {', '.join(sort_columns)}, order asc or desc."
+                }), 400
 
             # --- Base Query: tenants of current user via properties ---
             query = Tenant.query.join(Property).filter(Property.owner_id == self.user_id)
@@ -709,6 +778,19 @@ class TenantController:
                 elif status_filter.lower() == "inactive":
                     query = query.filter(Tenant.is_active.is_(False))
 
+            # --- Filter by payment rollups ---
+            try:
+                if request.args.get("min_balance"):
+                    query = query.filter(Tenant.outstanding_balance >= float(request.args["min_balance"]))
+
+                if request.args.get("due_before"):
+                    due_before = datetime.strptime(request.args["due_before"], "%Y-%m-%d").date()
+                    query = query.filter(Tenant.next_due_date <= due_before)
+            except ValueError:
+                return jsonify({
+                    "error": "Invalid min_balance or due_before (YYYY-MM-DD)."
+                }), 400
+
             # --- Search by name, email, phone ---
             if search:
                 like_pattern = f"%{search}%"
@@ -718,8 +800,40 @@ class TenantController:
                     (Tenant.phone.ilike(like_pattern))
                 )
 
+            # --- Project only the listed columns (no ORM entities) ---
+            query = query.with_entities(
+                Tenant.id,
+                Tenant.name,
+                Tenant.email,
+                Tenant.phone,
+                Tenant.property_id,
+                Property.name.label("property_name"),
+                Tenant.rent_amount,
+                Tenant.maintenance_amount,
+                Tenant.due_day,
+                Tenant.start_date,
+                Tenant.is_active,
+                Tenant.outstanding_balance,
+                Tenant.oldest_unpaid_month,
+                Tenant.next_due_date,
+                Tenant.created_at,
+                Tenant.updated_at
+            )
+
+            # --- Sorting ---
+            # Fully paid tenants sort last: their due date and oldest unpaid
+            # month are NULL and their balance is 0, in either direction.
+            column = sort_columns[sort]
+            key = column.desc() if order == "desc" else column.asc()
+            if sort == "created_at":
+                ordering = (key,)
+            elif sort == "balance" and order == "asc":
+                ordering = (case((column == 0, 1), else_=0), key, Tenant.id)
+            else:
+                ordering = (key.nulls_last(), Tenant.id)
+
             # --- Pagination ---
-            pagination = query.order_by(Tenant.created_at.desc()).paginate(
+            pagination = query.order_by(*ordering).paginate(
                 page=page, per_page=per_page, error_out=False
             )
             tenants = pagination.items
@@ -732,12 +846,15 @@ class TenantController:
                     "email": t.email,
                     "phone": t.phone,
                     "property_id": str(t.property_id),
-                    "property_name": t.property.name if t.property else None,
+                    "property_name": t.property_name,
                     "rent_amount": t.rent_amount,
                     "maintenance_amount": t.maintenance_amount,
                     "due_day": t.due_day,
                     "start_date": t.start_date.isoformat() if t.start_date else None,
                     "is_active": t.is_active,
+                    "outstanding_balance": float(t.outstanding_balance or 0),
+                    "oldest_unpaid_month": t.oldest_unpaid_month,
+                    "next_due_date": t.next_due_date.isoformat() if t.next_due_date else None,
                     "created_at": t.created_at.isoformat() if t.created_at else None,
                     "updated_at": t.updated_at.isoformat() if t.updated_at else None
                 }
@@ -758,6 +875,7 @@ class TenantController:
 
 
     # ---------------- GET TENANT DETAIL ----------------
+    @read_only
     def get_tenant_detail(self, tenant_id):
         try:
             tenant = (
@@ -786,6 +904,7 @@ class TenantController:
                     "due_day": tenant.due_day,
                     "start_date": tenant.start_date.isoformat() if tenant.start_date else None,
                     "is_active": tenant.is_active,
+                    "notify_channels": tenant.notify_channels,
                     "created_at": tenant.created_at.isoformat() if tenant.created_at else None,
                     "updated_at": tenant.updated_at.isoformat() if tenant.updated_at else None,
                     "property": {
@@ -806,7 +925,7 @@ class PropertyController:
 
     def __init__(self):
         self.data = request.get_json(silent=True) or request.form
-        self.user_id = get_jwt_identity()
+        self.user_id = current_user_id()
 
 
     # ---------------- ADD PROPERTY ----------------
@@ -889,6 +1008,7 @@ class PropertyController:
             return jsonify({"error": "Failed to delete property"}), 500
 
         
+    @read_only
     def get_all_properties(self):
         try:
             # --- Query params ---
@@ -951,6 +1071,7 @@ class PropertyController:
             current_app.logger.error(f"Error fetching properties: {e}", exc_info=True)
             return jsonify({"error": "Failed to fetch properties"}), 500
             
+    @read_only
     def get_property_detail(self, property_id):
         try:
             property_obj = Property.query.filter_by(
@@ -1000,8 +1121,9 @@ class PaymentController:
 
     def __init__(self):
         self.data = request.get_json(silent=True) or request.form
-        self.user_id = get_jwt_identity()
+        self.user_id = current_user_id()
 
+    @read_only
     def get_pending_summary(self):
         try:
             payments = (
@@ -1042,12 +1164,20 @@ class PaymentController:
 
         
         
+    @read_only
     def get_tenant_payments(self, tenant_id):
         try:
             payments = (
-                Payment.query
-                .join(Tenant)
-                .join(Property)
+                db.session.query(
+                    Payment.id,
+                    Payment.month,
+                    Payment.rent_amount,
+                    Payment.maintenance_amount,
+                    Payment.status,
+                    Payment.paid_on
+                )
+                .join(Tenant, Payment.tenant_id == Tenant.id)
+                .join(Property, Tenant.property_id == Property.id)
                 .filter(
                     Payment.tenant_id == tenant_id,
                     Property.owner_id == self.user_id
@@ -1062,7 +1192,7 @@ class PaymentController:
                     "rent_amount": p.rent_amount,
                     "maintenance_amount": p.maintenance_amount,
                     "total": p.rent_amount + p.maintenance_amount,
-                    "status": p.status,
+                    "status": p.status.value if p.status else None,
                     "paid_on": p.paid_on.isoformat() if p.paid_on else None
                 }
                 for p in payments
@@ -1094,6 +1224,9 @@ class PaymentController:
             payment.status = PaymentStatus.PAID
             payment.paid_on = date.today()
             payment.payment_mode = self.data.get("payment_mode", "Cash")
+            close_schedule(ReminderSchedule.payment_id == payment.id)
+            db.session.flush()
+            refresh_tenant_rollups(Tenant.id == payment.tenant_id)
 
             db.session.commit()
 
@@ -1114,8 +1247,9 @@ class DashboardController:
 
     def __init__(self):
         self.data = request.get_json(silent=True) or request.form
-        self.user_id = get_jwt_identity()
+        self.user_id = current_user_id()
 
+    @read_only
     def get_dashboard_summary(self):
         try:
             today = date.today()
@@ -1167,54 +1301,143 @@ class DashboardController:
             current_app.logger.error(f"Dashboard error: {e}", exc_info=True)
             return jsonify({"message": "Failed to load dashboard"}), 500
 
+    def _overdue_expressions(self, today):
+        """(due_date, days_overdue, amount) of a payment as SQL expressions."""
+        due_date = due_date_expr()
+        days_overdue = days_overdue_expr(today, due_date)
+        amount = Payment.rent_amount + func.coalesce(Payment.maintenance_amount, 0)
+        return due_date, days_overdue, amount
+
+    def _overdue_query(self, today, days_overdue, *columns):
+        """``columns`` of this owner's PENDING payments past their due date, across all months."""
+        return (
+            db.session.query(*columns)
+            .select_from(Payment)
+            .join(Tenant, Payment.tenant_id == Tenant.id)
+            .join(Property, Tenant.property_id == Property.id)
+            .filter(
+                Property.owner_id == self.user_id,
+                Payment.status == PaymentStatus.PENDING,
+                # Later months cannot be overdue yet; keeps the status/month index usable.
+                Payment.month <= today.strftime("%Y-%m"),
+                days_overdue > 0
+            )
+        )
+
+    @read_only
     def get_overdue_payments(self):
         try:
             today = date.today()
-            month_str = today.strftime("%Y-%m")
+            sort = request.args.get("sort", "days_overdue")
+            order = request.args.get("order", "desc")
 
-            payments = (
-                Payment.query
-                .join(Tenant)
-                .join(Property)
-                .filter(
-                    Property.owner_id == self.user_id,
-                    Payment.month == month_str,
-                    Payment.status == PaymentStatus.PENDING
-                )
-                .all()
+            if sort not in ("days_overdue", "amount") or order not in ("asc", "desc"):
+                return jsonify({
+                    "error": "sort must be days_overdue or amount, order asc or desc."
+                }), 400
+
+            due_date, days_overdue, amount = self._overdue_expressions(today)
+            query = self._overdue_query(
+                today,
+                days_overdue,
+                Payment.id,
+                Payment.month,
+                amount.label("amount"),
+                due_date.label("due_date"),
+                days_overdue.label("days_overdue"),
+                Tenant.name.label("tenant_name"),
+                Tenant.phone,
+                Tenant.due_day
             )
 
-            overdue_list = []
+            key = days_overdue if sort == "days_overdue" else amount
+            key = key.desc() if order == "desc" else key.asc()
 
-            for p in payments:
-                last_day = monthrange(today.year, today.month)[1]
-                due_day = min(p.tenant.due_day, last_day)
-                due_date = date(today.year, today.month, due_day)
-                if today > due_date:
-                    overdue_list.append({
-                        "payment_id": str(p.id),
-                        "tenant_name": p.tenant.name,
-                        "phone": p.tenant.phone,
-                        "amount": p.rent_amount + p.maintenance_amount,
-                        "due_day": p.tenant.due_day,
-                        "days_overdue": (today - due_date).days
-                    })
+            payments = query.order_by(key, Payment.id).all()
+
+            overdue_list = [
+                {
+                    "payment_id": str(p.id),
+                    "tenant_name": p.tenant_name,
+                    "phone": p.phone,
+                    "month": p.month,
+                    "amount": p.amount,
+                    "due_day": p.due_day,
+                    "due_date": p.due_date.isoformat(),
+                    "days_overdue": p.days_overdue
+                }
+                for p in payments
+            ]
 
             return jsonify(overdue_list), 200
 
         except Exception as e:
             current_app.logger.error(f"Overdue fetch failed: {e}", exc_info=True)
             return jsonify({"message": "Failed to fetch overdue payments"}), 500
+
+    @read_only
+    def get_overdue_aging(self):
+        try:
+            today = date.today()
+
+            _, days_overdue, amount = self._overdue_expressions(today)
+            # Bucket per payment in a subquery, then group on that column.
+            per_payment = self._overdue_query(
+                today,
+                days_overdue,
+                aging_bucket_expr(days_overdue).label("bucket"),
+                amount.label("amount")
+            ).subquery()
+
+            rows = (
+                db.session.query(
+                    per_payment.c.bucket,
+                    func.count().label("payments"),
+                    func.sum(per_payment.c.amount).label("amount")
+                )
+                .group_by(per_payment.c.bucket)
+                .all()
+            )
+
+            totals = {row.bucket: row for row in rows}
+            buckets = [
+                {
+                    "bucket": label,
+                    "count": totals[label].payments if label in totals else 0,
+                    "amount": float(totals[label].amount or 0) if label in totals else 0
+                }
+                for label, _ in AGING_BUCKETS
+            ]
+
+            return jsonify({
+                "as_of": today.isoformat(),
+                "overdue_count": sum(b["count"] for b in buckets),
+                "overdue_amount": sum(b["amount"] for b in buckets),
+                "buckets": buckets
+            }), 200
+
+        except Exception as e:
+            current_app.logger.error(f"Overdue aging failed: {e}", exc_info=True)
+            return jsonify({"message": "Failed to fetch overdue aging"}), 500
         
 
+    @read_only
     def get_monthly_payments(self):        #owner view
         try:
             month = request.args.get("month") or date.today().strftime("%Y-%m")
 
             payments = (
-                Payment.query
-                .join(Tenant)
-                .join(Property)
+                db.session.query(
+                    Payment.id,
+                    Payment.rent_amount,
+                    Payment.maintenance_amount,
+                    Payment.status,
+                    Payment.paid_on,
+                    Tenant.name.label("tenant_name"),
+                    Tenant.phone
+                )
+                .join(Tenant, Payment.tenant_id == Tenant.id)
+                .join(Property, Tenant.property_id == Property.id)
                 .filter(
                     Property.owner_id == self.user_id,
                     Payment.month == month
@@ -1226,12 +1449,12 @@ class DashboardController:
             return jsonify([
                 {
                     "id": str(p.id),
-                    "tenant": p.tenant.name,
-                    "phone": p.tenant.phone,
+                    "tenant": p.tenant_name,
+                    "phone": p.phone,
                     "rent": p.rent_amount,
                     "maintenance": p.maintenance_amount,
                     "total": p.rent_amount + p.maintenance_amount,
-                    "status": p.status,
+                    "status": p.status.value if p.status else None,
                     "paid_on": p.paid_on.isoformat() if p.paid_on else None
                 }
                 for p in payments
@@ -1242,12 +1465,82 @@ class DashboardController:
             return jsonify({"message": "Failed to fetch payments"}), 500
 
 
+class ReminderRuleController:
+
+    def __init__(self):
+        self.data = request.get_json(silent=True) or request.form
+        self.user_id = current_user_id()
+
+    @read_only
+    def get_rules(self):
+        try:
+            offsets = [
+                row.offset_days
+                for row in (
+                    db.session.query(ReminderRule.offset_days)
+                    .filter(ReminderRule.owner_id == self.user_id)
+                    .order_by(ReminderRule.offset_days)
+                )
+            ]
+
+            return jsonify({
+                "offsets": offsets or default_offsets(),
+                "is_default": not offsets
+            }), 200
 
+        except Exception:
+            current_app.logger.error("Failed to fetch reminder rules", exc_info=True)
+            return jsonify({"error": "Failed to fetch reminder rules"}), 500
 
+    def update_rules(self):
+        try:
+            offsets = self.data.get("offsets")
+            if isinstance(offsets, str):
+                # Form field: "-2,0,3"
+                try:
+                    offsets = [int(item) for item in offsets.split(",") if item.strip()]
+                except ValueError:
+                    offsets = None
 
+            if not isinstance(offsets, list) or not all(
+                isinstance(offset, int) and not isinstance(offset, bool) for offset in offsets
+            ):
+                return jsonify({
+                    "error": "offsets must be a list of integers."
+                }), 400
 
+            if not all(MIN_OFFSET <= offset <= MAX_OFFSET for offset in offsets):
+                return jsonify({
+                    "error": f"offsets must be between {MIN_OFFSET} and {MAX_OFFSET} days."
+                }), 400
 
+            offsets = sorted(set(offsets))
 
+            if len(offsets) > 10:
+                return jsonify({
+                    "error": "At most 10 reminder offsets are allowed."
+                }), 400
 
+            # Replace the owner's rules; an empty list restores the defaults.
+            ReminderRule.query.filter_by(owner_id=self.user_id).delete(synchronize_session=False)
+            for offset in offsets:
+                db.session.add(ReminderRule(owner_id=self.user_id, offset_days=offset))
+            db.session.flush()
 
+            scheduled = reschedule_owner(self.user_id)
+            db.session.commit()
 
+            current_app.logger.info(
+                f"Reminder rules updated by user {self.user_id}: {offsets or 'default'} ({scheduled} reminders scheduled)"
+            )
+
+            return jsonify({
+                "message": "Reminder rules updated.",
+                "offsets": offsets or default_offsets(),
+                "is_default": not offsets
+            }), 200
+
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("Failed to update reminder rules")
+            return jsonify({"error": "Failed to update reminder rules"}), 500
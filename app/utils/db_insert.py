@@ -0,0 +1,24 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+
+
+def insert_ignore(model, rows, index_elements):
+    """Bulk insert ``rows``, skipping any that conflict on ``index_elements``.
+
+    Concurrent writers cannot double-insert: the database drops the
+    conflicting rows instead of raising.
+    """
+    if not rows:
+        return
+
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        stmt = postgresql.insert(model).on_conflict_do_nothing(index_elements=index_elements)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(model).on_conflict_do_nothing(index_elements=index_elements)
+    else:
+        stmt = model.__table__.insert()
+
+    db.session.execute(stmt, rows)
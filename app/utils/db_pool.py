@@ -0,0 +1,84 @@
+import os
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+from app.utils.metrics import registry
+
+
+POOL_WAIT = registry.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection (includes connecting when the pool grows).",
+)
+POOL_TIMEOUTS = registry.counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after pool_timeout.",
+)
+POOL_CHECKED_OUT = registry.gauge("db_pool_checked_out", "Connections currently checked out.")
+POOL_OVERFLOW = registry.gauge("db_pool_overflow", "Connections open beyond pool_size.")
+POOL_SIZE = registry.gauge("db_pool_size", "Configured pool_size.")
+
+# Engines of the most recent app, by bind label; disposed in forked children.
+_engines = {}
+_fork_hook_registered = False
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records checkout wait time and timeouts."""
+
+    bind_label = "default"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            POOL_TIMEOUTS.inc(bind=self.bind_label)
+            raise
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - start, bind=self.bind_label)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.bind_label = self.bind_label
+        return pool
+
+
+def _pool_stat(engine, name):
+    fn = getattr(engine.pool, name, None)
+    return fn() if callable(fn) else None
+
+
+def _dispose_after_fork():
+    # Connections opened by the parent (gunicorn preload_app, celery
+    # prefork) must not be shared with the child; drop them without
+    # closing the parent's sockets.
+    for engine in _engines.values():
+        engine.dispose(close=False)
+
+
+def init_pools(app, db):
+    """Label pool metrics per bind and dispose inherited pools after fork.
+
+    The fork hook is registered once per process; each call replaces the
+    engines it disposes, so building several apps does not stack hooks.
+    """
+    global _fork_hook_registered
+
+    with app.app_context():
+        engines = dict(db.engines)
+
+    _engines.clear()
+    for key, engine in engines.items():
+        label = key or "default"
+        engine.pool.bind_label = label
+        _engines[label] = engine
+
+        POOL_CHECKED_OUT.set_function(lambda e=engine: _pool_stat(e, "checkedout"), bind=label)
+        POOL_OVERFLOW.set_function(lambda e=engine: max(_pool_stat(e, "overflow") or 0, 0), bind=label)
+        POOL_SIZE.set_function(lambda e=engine: _pool_stat(e, "size"), bind=label)
+
+    if not _fork_hook_registered and hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=_dispose_after_fork)
+        _fork_hook_registered = True
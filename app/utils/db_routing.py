@@ -0,0 +1,107 @@
+from functools import wraps
+
+from flask import current_app, g, has_app_context, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+from app.utils.redis_client import get_redis_client
+
+
+REPLICA_BIND = "replica"
+
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica bind inside ``read_only`` calls.
+
+    Flushes and anything outside a ``read_only`` block always use the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and has_app_context()
+            and g.get("_use_replica")
+        ):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _current_owner():
+    if not has_request_context():
+        return None
+    try:
+        from flask_jwt_extended import get_jwt_identity
+        return get_jwt_identity()
+    except RuntimeError:
+        return None
+
+
+def _recent_write_key(owner_id):
+    return f"ryw:{owner_id}"
+
+
+def replica_enabled():
+    return REPLICA_BIND in (current_app.config.get("SQLALCHEMY_BINDS") or {})
+
+
+def use_replica_for(owner_id):
+    """Replica reads are allowed unless the owner wrote within the lag window."""
+    if not owner_id or not replica_enabled():
+        return False
+    try:
+        return not get_redis_client().exists(_recent_write_key(owner_id))
+    except Exception:
+        current_app.logger.warning("Replica routing check failed, using primary", exc_info=True)
+        return False
+
+
+def read_only(fn):
+    """Route the queries of a controller method to the replica when safe."""
+
+    @wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        if not use_replica_for(getattr(self, "user_id", None)):
+            return fn(self, *args, **kwargs)
+
+        g._use_replica = True
+        try:
+            return fn(self, *args, **kwargs)
+        finally:
+            g._use_replica = False
+
+    return wrapper
+
+
+# ---------------- Read-your-writes tracking ----------------
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _clear_write(session):
+    session.info.pop("wrote", None)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _remember_owner_write(session):
+    if not session.info.pop("wrote", False) or not replica_enabled():
+        return
+
+    owner_id = _current_owner()
+    if not owner_id:
+        return
+
+    try:
+        get_redis_client().setex(
+            _recent_write_key(owner_id),
+            current_app.config.get("REPLICA_READ_YOUR_WRITES_SECONDS", 5),
+            "1",
+        )
+    except Exception:
+        current_app.logger.warning("Failed to record write for replica routing", exc_info=True)
@@ -0,0 +1,50 @@
+from sqlalchemy import Date, Integer, Interval, String, case, cast, func, literal, literal_column
+
+from app import db
+from app.models import Payment, Tenant
+
+
+# Aging buckets of overdue payments: (label, last day overdue); None = open ended.
+AGING_BUCKETS = (("0-30", 30), ("31-60", 60), ("60+", None))
+
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+
+def _clamped_due_day(last_day):
+    return case((Tenant.due_day > last_day, last_day), else_=Tenant.due_day)
+
+
+def due_date_expr():
+    """SQL expression for a payment's due date: the tenant's due day, clamped to the month's last day.
+
+    Matches ``reminder_slots.due_date_for``: a tenancy starting after that day
+    is due on its start date. The query must join Payment to Tenant.
+    """
+    if _dialect() == "sqlite":
+        month_start = Payment.month.concat("-01")
+        last_day = cast(func.strftime("%d", func.date(month_start, "+1 month", "-1 day")), Integer)
+        modifier = literal("+").concat(cast(_clamped_due_day(last_day) - 1, String)).concat(" days")
+        due_date = func.date(month_start, modifier, type_=Date)
+    else:
+        month_start = func.to_date(Payment.month, "YYYY-MM", type_=Date)
+        month_end = month_start + literal_column("INTERVAL '1 month - 1 day'", Interval)
+        last_day = cast(func.date_part("day", month_end), Integer)
+        due_date = month_start + (_clamped_due_day(last_day) - 1)
+
+    return case((Tenant.start_date > due_date, Tenant.start_date), else_=due_date)
+
+
+def days_overdue_expr(today, due_date):
+    """SQL expression for whole days between ``due_date`` and ``today`` (negative before it is due)."""
+    if _dialect() == "sqlite":
+        return cast(func.julianday(today.isoformat()) - func.julianday(due_date), Integer)
+
+    return literal(today, Date) - due_date
+
+
+def aging_bucket_expr(days_overdue):
+    """SQL expression labelling ``days_overdue`` with its AGING_BUCKETS label."""
+    whens = [(days_overdue <= last_day, label) for label, last_day in AGING_BUCKETS if last_day is not None]
+    return case(*whens, else_=AGING_BUCKETS[-1][0])
@@ -1,17 +1,19 @@
 import time
+import uuid
 from flask import current_app
 from flask_jwt_extended import (
     create_access_token,
     create_refresh_token,
     get_jwt,
+    get_jwt_identity,
 )
 from werkzeug.security import generate_password_hash, check_password_hash
-from flask_mail import Message
-from twilio.rest import Client
 
-from app import mail
 from app.config import Config
+from app.utils.message_templates import render_message
+from app.utils.reminder_slots import due_date_for, reminder_kind
 from app.utils.token_blacklist import TokenBlacklist
+from app.utils.transport import get_transport
 
 
 # =====================================================
@@ -68,37 +70,53 @@ class AuthHelper:
         )
 
 
+def current_user_id():
+    """JWT identity as a UUID, so it binds to UUID(as_uuid=True) columns on every backend."""
+    identity = get_jwt_identity()
+    return uuid.UUID(identity) if identity else None
+
+
 # =====================================================
-# Email Helper
+# Message Context
 # =====================================================
 
-class EmailHelper:
+def rent_reminder_context(tenant, payment, arrears=None):
+    """Template context for a rent reminder; ``arrears`` is [(month, amount)] for a consolidated one."""
+    due_date = due_date_for(payment.month, tenant.due_day, tenant.start_date)
 
-    def rent_email_body(self, tenant, payment, reminder_type):
-        total = payment.rent_amount + payment.maintenance_amount
+    context = {
+        "name": tenant.name,
+        "month": payment.month,
+        "total": payment.rent_amount + payment.maintenance_amount,
+        "status": getattr(payment.status, "value", payment.status),
+        "due_date": due_date.strftime("%d %b"),
+    }
 
-        subject_map = {
-            "BEFORE": "Upcoming Rent Reminder",
-            "ON": "Rent Due Today",
-            "AFTER": "Overdue Rent Notice",
-        }
+    if arrears:
+        context.update({
+            "items": arrears,
+            "months": [month for month, _ in arrears],
+            "count": len(arrears),
+            "total": sum(amount for _, amount in arrears),
+        })
 
-        body = f"""
-Hello {tenant.name},
+    return context
 
-This is a reminder regarding your rent payment.
 
-Month : {payment.month}
-Amount : ₹{total}
-Status : {payment.status}
+# =====================================================
+# Email Helper
+# =====================================================
 
-Please make the payment as soon as possible.
+class EmailHelper:
 
-Thank you,
-RemindMyRent
-"""
+    def rent_email_body(self, tenant, payment, reminder_type, arrears=None):
+        message = render_message(
+            f"rent_{reminder_kind(reminder_type).lower()}",
+            "EMAIL",
+            **rent_reminder_context(tenant, payment, arrears),
+        )
 
-        return subject_map[reminder_type], body
+        return message.subject, message.body
 
     def send_rent_email(self, tenant, payment, reminder_type):
         subject, body = self.rent_email_body(
@@ -107,33 +125,19 @@ RemindMyRent
             reminder_type,
         )
 
-        msg = Message(
-            subject=subject,
-            recipients=[tenant.email],
+        self.send_message(tenant.email, subject, body)
+
+    def send_message(self, recipient, subject, body):
+        return get_transport("EMAIL").send(
+            to=recipient,
             body=body,
+            subject=subject,
         )
 
-        mail.send(msg)
-
     def send_welcome_email(self, email, username):
-        body = f"""
-Hello {username},
-
-Welcome to RemindMyRent!
-
-Thank you for registering with us.
+        message = render_message("welcome", "EMAIL", name=username)
 
-Regards,
-RemindMyRent Team
-"""
-
-        msg = Message(
-            subject="Welcome to RemindMyRent!",
-            recipients=[email],
-            body=body,
-        )
-
-        mail.send(msg)
+        self.send_message(email, message.subject, message.body)
 
 
 
@@ -144,24 +148,32 @@ RemindMyRent Team
 class TwilioHelper:
 
     def __init__(self):
-        self.client = Client(
-            Config.TWILIO_ACCOUNT_SID,
-            Config.TWILIO_AUTH_TOKEN,
-        )
+        self.sms = get_transport("SMS")
+        self.whatsapp = get_transport("WHATSAPP")
 
-        self.from_number = Config.TWILIO_PHONE_NUMBER
-        self.whatsapp_number = Config.TWILIO_WHATSAPP_NUMBER
-
-    def send_sms(self, to, message):
-        phone = str(to)
+    @staticmethod
+    def format_number(phone):
+        phone = str(phone)
 
         if not phone.startswith("+"):
             phone = "+91" + phone
 
-        response = self.client.messages.create(
-            body=message,
-            from_=self.from_number,
+        return phone
+
+    @staticmethod
+    def rent_message_body(tenant, payment, reminder_type, channel="SMS", arrears=None):
+        return render_message(
+            f"rent_{reminder_kind(reminder_type).lower()}",
+            channel,
+            **rent_reminder_context(tenant, payment, arrears),
+        ).body
+
+    def send_sms(self, to, message):
+        phone = self.format_number(to)
+
+        response = self.sms.send(
             to=phone,
+            body=message,
         )
 
         current_app.logger.info(
@@ -172,15 +184,11 @@ class TwilioHelper:
 
     def send_whatsapp(self, to_number, message):
 
-        phone = str(to_number)
-
-        if not phone.startswith("+"):
-            phone = "+91" + phone
+        phone = self.format_number(to_number)
 
-        msg = self.client.messages.create(
+        msg = self.whatsapp.send(
+            to=phone,
             body=message,
-            from_=self.whatsapp_number,
-            to=f"whatsapp:{phone}",
         )
 
         current_app.logger.info(
@@ -195,6 +203,7 @@ class TwilioHelper:
 
 def send_welcome_notifications_async(app, email, phone, username):
     with app.app_context():
+        twilio = TwilioHelper()
 
         # ---------------- Email ----------------
         try:
@@ -204,28 +213,17 @@ def send_welcome_notifications_async(app, email, phone, username):
 
         # ---------------- SMS ----------------
         try:
-            sms = (
-                f"Hello {username},\n\n"
-                "Welcome to RemindMyRent! 🎉\n"
-                "Your account has been created successfully.\n\n"
-                "Thank you for registering."
-            )
-
-            TwilioHelper().send_sms(phone,sms)
+            sms = render_message("welcome", "SMS", name=username).body
+
+            twilio.send_sms(phone,sms)
         except Exception as e:
             app.logger.exception(f"SMS failed: {e}")
 
         # ---------------- WhatsApp ----------------
         try:
-            message = f"""
-Hello {username},
-
-🎉 Welcome to RemindMyRent!
-
-Thank you for registering with us.
-"""
+            message = render_message("welcome", "WHATSAPP", name=username).body
 
-            TwilioHelper().send_whatsapp(phone, message)
+            twilio.send_whatsapp(phone, message)
         except Exception as e:
             app.logger.exception(f"WhatsApp failed: {e}")
 
@@ -236,26 +234,18 @@ Thank you for registering with us.
 
 def send_tenant_notifications_async(app, tenant, property_name, rent_amount, maintenance_amount, due_day):
     with app.app_context():
-        body = f"""
-        Hello {tenant.name},
-
-        You have been added as a tenant(Kirayedar) for {property_name}.
-
-        Rent Amount: ₹{rent_amount}
-        Maintenance Amount: ₹{maintenance_amount}
-        Due Date: {due_day}
-
-        Thank you.
-        """
+        twilio = TwilioHelper()
+        context = {
+            "name": tenant.name,
+            "property_name": property_name,
+            "rent_amount": rent_amount,
+            "maintenance_amount": maintenance_amount,
+            "due_day": due_day,
+        }
         # ---------------- Email ----------------
         try:
-            msg = Message(
-                subject="Welcome to RemindMyRent",
-                recipients=[tenant.email],
-                body=body,
-            )
-
-            mail.send(msg)
+            email = render_message("tenant_added", "EMAIL", **context)
+            EmailHelper().send_message(tenant.email, email.subject, email.body)
             app.logger.info(f"Tenant welcome email sent to {tenant.email}")
 
         except Exception as e:
@@ -263,7 +253,7 @@ def send_tenant_notifications_async(app, tenant, property_name, rent_amount, mai
 
         # ---------------- SMS ----------------
         try:
-            TwilioHelper().send_sms(tenant.phone, body)
+            twilio.send_sms(tenant.phone, render_message("tenant_added", "SMS", **context).body)
             app.logger.info(f"Tenant SMS sent to {tenant.phone}")
 
         except Exception as e:
@@ -271,7 +261,7 @@ def send_tenant_notifications_async(app, tenant, property_name, rent_amount, mai
 
         # ---------------- WhatsApp ----------------
         try:
-            TwilioHelper().send_whatsapp(tenant.phone, body)
+            twilio.send_whatsapp(tenant.phone, render_message("tenant_added", "WHATSAPP", **context).body)
             app.logger.info(f"Tenant WhatsApp sent to {tenant.phone}")
 
         except Exception as e:
@@ -0,0 +1,261 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from flask import current_app
+from jinja2 import Environment, StrictUndefined
+
+
+RenderedMessage = namedtuple("RenderedMessage", ["subject", "body"])
+
+
+# =====================================================
+# Registry
+# =====================================================
+
+# (kind, channel, locale) -> {"subject": ..., "body": ...}
+# SMS bodies stay within the GSM-7 alphabet (no ₹, no emoji) and one line,
+# so a reminder fits a single 160 character segment.
+TEMPLATES = {
+    # ---------------- Rent reminders ----------------
+    ("rent_before", "EMAIL", "en"): {
+        "subject": "Upcoming Rent Reminder",
+        "body": """Hello {{ name }},
+
+This is a reminder that your rent is due on {{ due_date }}.
+
+Month : {{ month }}
+Amount : ₹{{ total|amount }}
+Status : {{ status }}
+
+Please make the payment before the due date.
+
+Thank you,
+RemindMyRent
+""",
+    },
+    ("rent_on", "EMAIL", "en"): {
+        "subject": "Rent Due Today",
+        "body": """Hello {{ name }},
+
+Your rent is due today.
+
+Month : {{ month }}
+Amount : ₹{{ total|amount }}
+Status : {{ status }}
+
+Please make the payment as soon as possible.
+
+Thank you,
+RemindMyRent
+""",
+    },
+    ("rent_after", "EMAIL", "en"): {
+        "subject": "Overdue Rent Notice",
+        "body": """Hello {{ name }},
+
+Your rent for {{ month }} is overdue.
+
+Month : {{ month }}
+Amount : ₹{{ total|amount }}
+Status : {{ status }}
+
+Please make the payment as soon as possible.
+
+Thank you,
+RemindMyRent
+""",
+    },
+    ("rent_before", "SMS", "en"): {
+        "body": "Hi {{ name }}, rent Rs.{{ total|amount }} for {{ month }} is due on {{ due_date }}. -RemindMyRent",
+    },
+    ("rent_on", "SMS", "en"): {
+        "body": "Hi {{ name }}, rent Rs.{{ total|amount }} for {{ month }} is due today. -RemindMyRent",
+    },
+    ("rent_after", "SMS", "en"): {
+        "body": "Hi {{ name }}, rent Rs.{{ total|amount }} for {{ month }} is overdue. Please pay now. -RemindMyRent",
+    },
+    ("rent_before", "WHATSAPP", "en"): {
+        "body": "Hi {{ name }} 👋\nYour rent of ₹{{ total|amount }} for {{ month }} is due on {{ due_date }}.\n- RemindMyRent",
+    },
+    ("rent_on", "WHATSAPP", "en"): {
+        "body": "Hi {{ name }} 👋\nYour rent of ₹{{ total|amount }} for {{ month }} is due today.\n- RemindMyRent",
+    },
+    ("rent_after", "WHATSAPP", "en"): {
+        "body": "Hi {{ name }},\nYour rent of ₹{{ total|amount }} for {{ month }} is overdue. Please pay as soon as possible.\n- RemindMyRent",
+    },
+
+    # ---------------- Arrears (several unpaid months) ----------------
+    ("rent_arrears", "EMAIL", "en"): {
+        "subject": "Outstanding Rent Reminder",
+        "body": """Hello {{ name }},
+
+You have {{ count }} unpaid rent payments:
+
+{% for month, amount in items %}Month : {{ month }}  Amount : ₹{{ amount|amount }}
+{% endfor %}
+Total outstanding : ₹{{ total|amount }}
+
+Please clear the outstanding amount as soon as possible.
+
+Thank you,
+RemindMyRent
+""",
+    },
+    ("rent_arrears", "SMS", "en"): {
+        "body": "Hi {{ name }}, rent unpaid for {{ months[:4]|join(', ') }}{% if count > 4 %} +{{ count - 4 }} more{% endif %}. Total due Rs.{{ total|amount }}. Please pay now. -RemindMyRent",
+    },
+    ("rent_arrears", "WHATSAPP", "en"): {
+        "body": "Hi {{ name }},\nYou have {{ count }} unpaid rent payments:\n{% for month, amount in items %}• {{ month }}: ₹{{ amount|amount }}\n{% endfor %}Total outstanding: ₹{{ total|amount }}\n- RemindMyRent",
+    },
+
+    # ---------------- Owner digest ----------------
+    ("owner_digest", "EMAIL", "en"): {
+        "subject": "Rent digest {{ date }}: {{ overdue|length }} overdue, {{ due_today|length }} due today",
+        "body": """Hello {{ name }},
+
+Here is your rent summary for {{ date }}.
+{% if overdue %}
+Overdue ({{ overdue|length }} tenants, ₹{{ overdue_total|amount }}):
+{% for t in overdue %}- {{ t.tenant }} ({{ t.property }}) : ₹{{ t.amount|amount }}{% if t.months > 1 %}, {{ t.months }} months since {{ t.oldest_month }}{% else %} for {{ t.oldest_month }}{% endif %}
+{% endfor %}{% endif %}{% if due_today %}
+Due today ({{ due_today|length }} tenants, ₹{{ due_today_total|amount }}):
+{% for t in due_today %}- {{ t.tenant }} ({{ t.property }}) : ₹{{ t.amount|amount }}
+{% endfor %}{% endif %}
+Thank you,
+RemindMyRent
+""",
+    },
+
+    # ---------------- Welcome (owner registration) ----------------
+    ("welcome", "EMAIL", "en"): {
+        "subject": "Welcome to RemindMyRent!",
+        "body": """Hello {{ name }},
+
+Welcome to RemindMyRent!
+
+Thank you for registering with us.
+
+Regards,
+RemindMyRent Team
+""",
+    },
+    ("welcome", "SMS", "en"): {
+        "body": "Hello {{ name }}, welcome to RemindMyRent! Your account has been created successfully.",
+    },
+    ("welcome", "WHATSAPP", "en"): {
+        "body": "Hello {{ name }},\n\n🎉 Welcome to RemindMyRent!\n\nThank you for registering with us.",
+    },
+
+    # ---------------- Tenant added ----------------
+    ("tenant_added", "EMAIL", "en"): {
+        "subject": "Welcome to RemindMyRent",
+        "body": """Hello {{ name }},
+
+You have been added as a tenant (Kirayedar) for {{ property_name }}.
+
+Rent Amount: ₹{{ rent_amount|amount }}
+Maintenance Amount: ₹{{ maintenance_amount|amount }}
+Due Date: {{ due_day }}
+
+Thank you.
+""",
+    },
+    ("tenant_added", "SMS", "en"): {
+        "body": "Hi {{ name }}, you are now a tenant at {{ property_name }}. Rent Rs.{{ rent_amount|amount }} + maint. Rs.{{ maintenance_amount|amount }}, due on day {{ due_day }}. -RemindMyRent",
+    },
+    ("tenant_added", "WHATSAPP", "en"): {
+        "body": "Hello {{ name }},\nYou have been added as a tenant (Kirayedar) for {{ property_name }}.\nRent: ₹{{ rent_amount|amount }}\nMaintenance: ₹{{ maintenance_amount|amount }}\nDue date: {{ due_day }}",
+    },
+}
+
+DEFAULT_LOCALE = "en"
+
+
+def _amount(value):
+    value = float(value or 0)
+    return f"{value:.0f}" if value.is_integer() else f"{value:.2f}"
+
+
+_env = Environment(autoescape=False, undefined=StrictUndefined, keep_trailing_newline=True)
+_env.filters["amount"] = _amount
+
+
+@lru_cache(maxsize=None)
+def get_template(kind, channel, locale=DEFAULT_LOCALE):
+    """Compiled (subject, body) templates, falling back to the default locale.
+
+    Compiled once per process and cached; rendering then skips parsing.
+    """
+    source = TEMPLATES.get((kind, channel, locale)) or TEMPLATES.get((kind, channel, DEFAULT_LOCALE))
+    if source is None:
+        raise KeyError(f"No {channel} template for {kind}")
+
+    subject = _env.from_string(source["subject"]) if source.get("subject") else None
+    return subject, _env.from_string(source["body"])
+
+
+def precompile():
+    """Compile every registered template up front (e.g. at worker start)."""
+    for kind, channel, locale in TEMPLATES:
+        get_template(kind, channel, locale)
+
+
+def render_message(kind, channel, locale=None, **context):
+    if locale is None:
+        locale = current_app.config.get("NOTIFICATION_LOCALE", DEFAULT_LOCALE)
+
+    subject, body = get_template(kind, channel, locale)
+    text = body.render(**context)
+
+    if channel == "SMS":
+        text = compact_sms(text)
+
+    return RenderedMessage(subject.render(**context) if subject else None, text)
+
+
+# =====================================================
+# SMS Segments
+# =====================================================
+
+GSM7_BASIC = set(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+GSM7_EXTENDED = set("^{}\\[~]|€\f")
+
+# Common characters outside GSM-7 that would switch the whole message to UCS-2.
+_GSM7_SUBSTITUTIONS = {
+    "₹": "Rs.",
+    "‘": "'",
+    "’": "'",
+    "“": '"',
+    "”": '"',
+    "–": "-",
+    "—": "-",
+    "…": "...",
+}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def compact_sms(text):
+    """Collapse whitespace and replace non GSM-7 characters with ASCII equivalents."""
+    for char, replacement in _GSM7_SUBSTITUTIONS.items():
+        text = text.replace(char, replacement)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def sms_segments(text):
+    """Number of billed segments for ``text`` (GSM-7: 160/153, UCS-2: 70/67 chars)."""
+    if all(c in GSM7_BASIC or c in GSM7_EXTENDED for c in text):
+        length = sum(2 if c in GSM7_EXTENDED else 1 for c in text)
+        single, multi = 160, 153
+    else:
+        # Characters outside the BMP (emoji) take two UTF-16 code units.
+        length = sum(2 if ord(c) > 0xFFFF else 1 for c in text)
+        single, multi = 70, 67
+
+    if length <= single:
+        return 1
+    return -(-length // multi)
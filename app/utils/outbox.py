@@ -0,0 +1,320 @@
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.models import NotificationOutbox, Payment, PaymentStatus, ReminderLog
+from app.utils.db_insert import insert_ignore
+from app.utils.helper import EmailHelper, TwilioHelper
+from app.utils.reminder_slots import reminder_kind
+from app.utils.transport import CHANNELS, get_transport
+
+
+# =====================================================
+# Channel Preferences
+# =====================================================
+
+def parse_channels(value):
+    """Normalise a channel preference ("email, sms" or a list) to "EMAIL,SMS".
+
+    Returns None for an empty value (use the defaults). Raises ValueError on
+    unknown channels.
+    """
+    if not value:
+        return None
+
+    items = value.split(",") if isinstance(value, str) else value
+    channels = []
+    for item in items:
+        channel = str(item).strip().upper()
+        if not channel:
+            continue
+        if channel not in CHANNELS:
+            raise ValueError(f"Unknown channel: {channel}")
+        if channel not in channels:
+            channels.append(channel)
+
+    return ",".join(channels) or None
+
+
+def reminder_channels(tenant):
+    """Channels to remind ``tenant`` on: their preference, limited to reachable ones.
+
+    A tenant left with nothing reachable (typically no email) falls back to SMS.
+    """
+    preferred = tenant.notify_channels or current_app.config.get("DEFAULT_REMINDER_CHANNELS", "EMAIL")
+
+    channels = [
+        channel for channel in (parse_channels(preferred) or "").split(",")
+        if (channel == "EMAIL" and tenant.email) or (channel in ("SMS", "WHATSAPP") and tenant.phone)
+    ]
+
+    if not channels and tenant.phone:
+        channels = ["SMS"]
+
+    return channels
+
+
+# =====================================================
+# Enqueue
+# =====================================================
+
+def existing_intents(keys):
+    """Return the subset of (payment_id, reminder_type, channel) already handled.
+
+    Checks the outbox and, for reminders sent before it existed, ReminderLog.
+    """
+    keys = list(keys)
+    if not keys:
+        return set()
+
+    outbox = (
+        db.session.query(
+            NotificationOutbox.payment_id,
+            NotificationOutbox.reminder_type,
+            NotificationOutbox.channel
+        )
+        .filter(
+            tuple_(
+                NotificationOutbox.payment_id,
+                NotificationOutbox.reminder_type,
+                NotificationOutbox.channel
+            ).in_(keys)
+        )
+    )
+    logged = (
+        db.session.query(
+            ReminderLog.payment_id,
+            ReminderLog.reminder_type,
+            ReminderLog.sent_via
+        )
+        .filter(
+            tuple_(
+                ReminderLog.payment_id,
+                ReminderLog.reminder_type,
+                ReminderLog.sent_via
+            ).in_(keys)
+        )
+    )
+    return {tuple(row) for row in outbox.union(logged).all()}
+
+
+def enqueue(intents):
+    """Insert reminder intents, skipping any whose idempotency key exists.
+
+    ``intents`` is a list of dicts with payment_id, reminder_type and channel.
+    Concurrent runs cannot double-insert: conflicts on the unique key are
+    ignored by the database.
+    """
+    insert_ignore(NotificationOutbox, intents, ["payment_id", "reminder_type", "channel"])
+    return len(intents)
+
+
+# =====================================================
+# Dispatch
+# =====================================================
+
+def claim_batch(limit, lease_seconds):
+    """Claim up to ``limit`` due intents for this dispatcher and commit.
+
+    Claimed rows move to SENDING with a lease; rows whose lease ran out (a
+    dispatcher died mid-send) become claimable again. Each expired lease
+    counts as an attempt, so a message that keeps killing its dispatcher
+    ends up FAILED after OUTBOX_MAX_ATTEMPTS. SKIP LOCKED lets several
+    dispatchers drain the outbox in parallel.
+    """
+    now = datetime.utcnow()
+    max_attempts = current_app.config.get("OUTBOX_MAX_ATTEMPTS", 5)
+
+    rows = (
+        db.session.query(NotificationOutbox)
+        .filter(
+            NotificationOutbox.status.in_(["PENDING", "SENDING"]),
+            NotificationOutbox.next_attempt_at <= now
+        )
+        .order_by(NotificationOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+    ids = []
+    for row in rows:
+        if row.status == "SENDING":
+            row.attempts += 1
+            row.last_error = "Lease expired before the send completed"
+            if row.attempts >= max_attempts:
+                row.status = "FAILED"
+                continue
+        row.status = "SENDING"
+        row.next_attempt_at = now + timedelta(seconds=lease_seconds)
+        ids.append(row.id)
+
+    db.session.commit()
+
+    if not ids:
+        return []
+
+    return (
+        NotificationOutbox.query
+        .options(joinedload(NotificationOutbox.payment).joinedload(Payment.tenant))
+        .filter(NotificationOutbox.id.in_(ids))
+        .all()
+    )
+
+
+Rendered = namedtuple("Rendered", ["recipient", "subject", "body", "payment_ids"])
+
+
+def tenant_arrears(tenant_id):
+    """[(payment_id, month, amount)] of a tenant's PENDING payments, oldest first."""
+    return (
+        db.session.query(
+            Payment.id,
+            Payment.month,
+            Payment.rent_amount + func.coalesce(Payment.maintenance_amount, 0)
+        )
+        .filter(
+            Payment.tenant_id == tenant_id,
+            Payment.status == PaymentStatus.PENDING
+        )
+        .order_by(Payment.month)
+        .all()
+    )
+
+
+def render(intent):
+    """Render an outbox row, or return None if it is undeliverable.
+
+    ``payment_ids`` lists every payment the message covers: the intent's own
+    payment, or all outstanding payments for a consolidated arrears reminder.
+    """
+    payment = intent.payment
+    tenant = payment.tenant
+
+    if not tenant.is_active or payment.status != PaymentStatus.PENDING:
+        return None
+
+    arrears = None
+    payment_ids = [payment.id]
+    if reminder_kind(intent.reminder_type) == "ARREARS":
+        # Listed at send time, so months paid since enqueueing drop out.
+        rows = tenant_arrears(tenant.id)
+        arrears = [(month, amount) for _, month, amount in rows]
+        payment_ids = [payment_id for payment_id, _, _ in rows]
+
+    if intent.channel == "EMAIL":
+        if not tenant.email:
+            return None
+        subject, body = EmailHelper().rent_email_body(tenant, payment, intent.reminder_type, arrears)
+        return Rendered(tenant.email, subject, body, payment_ids)
+
+    if intent.channel in ("SMS", "WHATSAPP"):
+        if not tenant.phone:
+            return None
+        body = TwilioHelper.rent_message_body(tenant, payment, intent.reminder_type, intent.channel, arrears)
+        return Rendered(TwilioHelper.format_number(tenant.phone), None, body, payment_ids)
+
+    return None
+
+
+_executors = {}
+_executors_pid = None
+_executors_lock = threading.Lock()
+
+
+def _executor(channel):
+    """Per-process thread pool for ``channel``, sized by OUTBOX_<CHANNEL>_CONCURRENCY."""
+    global _executors_pid
+
+    with _executors_lock:
+        if _executors_pid != os.getpid():
+            # Threads do not survive a fork; a prefork child builds its own pools.
+            _executors.clear()
+            _executors_pid = os.getpid()
+
+        executor = _executors.get(channel)
+        if executor is None:
+            workers = max(1, current_app.config.get(f"OUTBOX_{channel}_CONCURRENCY", 4))
+            executor = _executors[channel] = ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix=f"outbox-{channel.lower()}",
+            )
+        return executor
+
+
+def _send(app, transport, recorder, channel, recipient, subject, body):
+    with app.app_context():
+        with recorder.send(channel):
+            receipt = transport.send(to=recipient, body=body, subject=subject)
+    return getattr(receipt, "sid", None)
+
+
+def deliver_many(jobs, recorder):
+    """Send rendered intents concurrently, one bounded thread pool per channel.
+
+    ``jobs`` is a list of (intent, recipient, subject, body). Yields
+    (intent, provider_id, error) as sends complete. Only the provider call runs
+    on pool threads; the caller updates the ORM rows on its own thread.
+    """
+    app = current_app._get_current_object()
+    transports = {}
+    futures = {}
+
+    for intent, recipient, subject, body in jobs:
+        channel = intent.channel
+        if channel not in transports:
+            transports[channel] = get_transport(channel)
+
+        future = _executor(channel).submit(
+            _send, app, transports[channel], recorder, channel, recipient, subject, body
+        )
+        futures[future] = intent
+
+    for future in as_completed(futures):
+        try:
+            yield futures[future], future.result(), None
+        except Exception as e:
+            yield futures[future], None, e
+
+
+def mark_sent(intent, provider_id=None, payment_ids=None):
+    """Mark ``intent`` sent and log the reminder against every covered payment."""
+    intent.status = "SENT"
+    intent.sent_at = datetime.utcnow()
+    intent.provider_id = provider_id
+    intent.attempts += 1
+    intent.last_error = None
+
+    for payment_id in payment_ids or [intent.payment_id]:
+        db.session.add(ReminderLog(
+            payment_id=payment_id,
+            reminder_type=intent.reminder_type,
+            sent_via=intent.channel
+        ))
+
+
+def mark_failed(intent, error):
+    """Schedule a retry with exponential back-off, or give up after the max attempts."""
+    config = current_app.config
+    intent.attempts += 1
+    intent.last_error = str(error)[:1000]
+
+    if intent.attempts >= config.get("OUTBOX_MAX_ATTEMPTS", 5):
+        intent.status = "FAILED"
+        return
+
+    delay = config.get("OUTBOX_RETRY_BACKOFF_SECONDS", 60) * 2 ** (intent.attempts - 1)
+    intent.status = "PENDING"
+    intent.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+
+
+def mark_skipped(intent, reason):
+    intent.status = "FAILED"
+    intent.last_error = reason
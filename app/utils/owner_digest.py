@@ -0,0 +1,76 @@
+from itertools import groupby
+
+from sqlalchemy import case, func
+
+from app import db
+from app.models import Payment, PaymentStatus, Property, Tenant, User
+from app.utils.due_dates import days_overdue_expr, due_date_expr
+
+
+def digest_rows(today):
+    """One row per (owner, tenant) with PENDING payments overdue or due ``today``.
+
+    A single grouped query across all owners, using the same due date and
+    days-overdue expressions as /overdue.
+    """
+    days_overdue = days_overdue_expr(today, due_date_expr())
+    overdue = days_overdue > 0
+
+    return (
+        db.session.query(
+            User.id.label("owner_id"),
+            User.username,
+            User.email,
+            Property.name.label("property_name"),
+            Tenant.name.label("tenant_name"),
+            func.count(Payment.id).label("months"),
+            func.sum(Payment.rent_amount + func.coalesce(Payment.maintenance_amount, 0)).label("amount"),
+            func.min(Payment.month).label("oldest_month"),
+            func.max(case((overdue, 1), else_=0)).label("overdue")
+        )
+        .select_from(Payment)
+        .join(Tenant, Payment.tenant_id == Tenant.id)
+        .join(Property, Tenant.property_id == Property.id)
+        .join(User, Property.owner_id == User.id)
+        .filter(
+            Payment.status == PaymentStatus.PENDING,
+            Tenant.is_active.is_(True),
+            # Later months cannot be due yet; keeps the status/month index usable.
+            Payment.month <= today.strftime("%Y-%m"),
+            days_overdue >= 0
+        )
+        .group_by(User.id, User.username, User.email, Property.name, Tenant.id, Tenant.name)
+        .order_by(User.id, Property.name, Tenant.name)
+        .all()
+    )
+
+
+def owner_digests(today):
+    """Template context of every owner's digest, built from :func:`digest_rows`."""
+    digests = []
+
+    for _, rows in groupby(digest_rows(today), key=lambda row: row.owner_id):
+        rows = list(rows)
+        overdue, due_today = [], []
+
+        for row in rows:
+            item = {
+                "tenant": row.tenant_name,
+                "property": row.property_name,
+                "months": row.months,
+                "amount": row.amount,
+                "oldest_month": row.oldest_month,
+            }
+            (overdue if row.overdue else due_today).append(item)
+
+        digests.append({
+            "email": rows[0].email,
+            "name": rows[0].username,
+            "date": today.strftime("%d %b %Y"),
+            "overdue": overdue,
+            "due_today": due_today,
+            "overdue_total": sum(item["amount"] for item in overdue),
+            "due_today_total": sum(item["amount"] for item in due_today),
+        })
+
+    return digests
@@ -0,0 +1,95 @@
+from calendar import monthrange
+from datetime import date
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app import db
+from app.models import Payment, PaymentStatus, Tenant
+from app.utils.db_insert import insert_ignore
+from app.utils.due_dates import due_date_expr
+
+
+def occupancy(month, start_date):
+    """Fraction of ``month`` ("YYYY-MM") covered by a tenancy starting on ``start_date``."""
+    year, month = map(int, month.split("-"))
+    days = monthrange(year, month)[1]
+
+    if start_date is None or start_date <= date(year, month, 1):
+        return 1
+    if start_date > date(year, month, days):
+        return 0
+    return (days - start_date.day + 1) / days
+
+
+def materialize_payments(month, *criteria):
+    """Create the missing PENDING payments for ``month`` of active tenants matching ``criteria``.
+
+    Only tenants without a payment for the month are read, so repeated runs
+    handle just the delta. A tenancy starting during the month pays a share
+    prorated by ``start_date`` (PRORATE_PARTIAL_MONTHS); one starting later
+    gets no payment yet. Concurrent callers cannot create duplicates: the
+    insert skips rows that conflict on (tenant_id, month). Returns the number
+    of payments built.
+    """
+    has_payment = (
+        select(Payment.id)
+        .where(Payment.tenant_id == Tenant.id, Payment.month == month)
+        .exists()
+    )
+
+    tenants = (
+        db.session.query(Tenant.id, Tenant.rent_amount, Tenant.maintenance_amount, Tenant.start_date)
+        .filter(Tenant.is_active.is_(True), ~has_payment, *criteria)
+        .all()
+    )
+
+    prorate = current_app.config.get("PRORATE_PARTIAL_MONTHS", True)
+
+    rows = []
+    for tenant in tenants:
+        share = occupancy(month, tenant.start_date)
+        if share == 0:
+            continue
+        if not prorate:
+            share = 1
+
+        rows.append({
+            "tenant_id": tenant.id,
+            "month": month,
+            "rent_amount": round(tenant.rent_amount * share, 2),
+            "maintenance_amount": round((tenant.maintenance_amount or 0) * share, 2),
+            "status": PaymentStatus.PENDING,
+        })
+
+    insert_ignore(Payment, rows, ["tenant_id", "month"])
+    return len(rows)
+
+
+def refresh_tenant_rollups(*criteria):
+    """Recompute the payment rollups of tenants matching ``criteria`` in one UPDATE.
+
+    Call after payments of those tenants are created, paid or cancelled.
+    Returns the number of tenants updated.
+    """
+    unpaid = (Payment.tenant_id == Tenant.id) & (Payment.status == PaymentStatus.PENDING)
+    amount = Payment.rent_amount + func.coalesce(Payment.maintenance_amount, 0)
+
+    balance = select(func.coalesce(func.sum(amount), 0)).where(unpaid).scalar_subquery()
+    oldest_month = select(func.min(Payment.month)).where(unpaid).scalar_subquery()
+    next_due = select(func.min(due_date_expr())).where(unpaid).scalar_subquery()
+
+    return (
+        Tenant.query
+        .filter(*criteria)
+        .update(
+            {
+                Tenant.outstanding_balance: balance,
+                Tenant.oldest_unpaid_month: oldest_month,
+                Tenant.next_due_date: next_due,
+                # Derived data; not an edit of the tenant record.
+                Tenant.updated_at: Tenant.updated_at,
+            },
+            synchronize_session=False
+        )
+    )
@@ -0,0 +1,169 @@
+import io
+import random
+import time
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+
+from app.utils.metrics import registry
+
+
+REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds",
+    "Wall time per request.",
+)
+REQUEST_QUERIES = registry.histogram(
+    "http_request_db_queries",
+    "SQL statements executed per request.",
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250),
+)
+REQUEST_DB_TIME = registry.histogram(
+    "http_request_db_seconds",
+    "Time spent executing SQL per request.",
+)
+BUDGET_EXCEEDED = registry.counter(
+    "http_request_query_budget_exceeded_total",
+    "Requests that ran more SQL statements than their route's budget.",
+)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(max_queries):
+    """Declare the maximum number of SQL statements a view may execute."""
+
+    def decorator(fn):
+        fn._query_budget = max_queries
+        return fn
+
+    return decorator
+
+
+class RequestProfiler:
+    """Opt-in per-request wall time, SQL count and SQL time.
+
+    Enabled with REQUEST_PROFILING. Slow requests can additionally be
+    sampled with cProfile (or pyinstrument when installed and selected), and
+    QUERY_BUDGET_ENFORCE turns a blown ``@query_budget`` into an error so
+    test suites fail on N+1 regressions.
+    """
+
+    def init_app(self, app, db):
+        if not app.config.get("REQUEST_PROFILING"):
+            return
+
+        with app.app_context():
+            engines = list(db.engines.values())
+
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+
+    # ---------------- SQL hooks ----------------
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_profiling_start", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("_profiling_start")
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+
+        if has_app_context() and "_profiling" in g:
+            g._profiling["queries"] += 1
+            g._profiling["db_time"] += elapsed
+
+    # ---------------- Request hooks ----------------
+
+    def _start_request(self):
+        g._profiling = {"start": time.perf_counter(), "queries": 0, "db_time": 0.0, "profiler": None}
+
+        sample_rate = current_app.config.get("PROFILE_SAMPLE_RATE", 0.0)
+        if sample_rate and random.random() < sample_rate:
+            g._profiling["profiler"] = self._start_profiler()
+
+    def _finish_request(self, response):
+        state = g.pop("_profiling", None)
+        if state is None:
+            return response
+
+        duration = time.perf_counter() - state["start"]
+        endpoint = request.endpoint or "unmatched"
+        labels = {"endpoint": endpoint, "method": request.method}
+
+        REQUEST_DURATION.observe(duration, status=str(response.status_code), **labels)
+        REQUEST_QUERIES.observe(state["queries"], **labels)
+        REQUEST_DB_TIME.observe(state["db_time"], **labels)
+
+        response.headers["Server-Timing"] = (
+            f'app;dur={duration * 1000:.1f}, db;dur={state["db_time"] * 1000:.1f};desc="{state["queries"]} queries"'
+        )
+
+        if state["profiler"] is not None:
+            report = self._stop_profiler(state["profiler"])
+            slow_ms = current_app.config.get("PROFILE_SLOW_REQUEST_MS", 500)
+            if duration * 1000 >= slow_ms:
+                current_app.logger.warning(
+                    f"Slow request {request.method} {request.path} "
+                    f"({duration * 1000:.0f} ms, {state['queries']} queries):\n{report}"
+                )
+
+        budget = self._budget_for(endpoint)
+        if budget is not None and state["queries"] > budget:
+            BUDGET_EXCEEDED.inc(**labels)
+            message = f"{endpoint} ran {state['queries']} SQL statements (budget {budget})"
+            if current_app.config.get("QUERY_BUDGET_ENFORCE"):
+                raise QueryBudgetExceeded(message)
+            current_app.logger.warning(message)
+
+        return response
+
+    def _teardown_request(self, exc):
+        # after_request is skipped when the view raised; never leave a
+        # profiler enabled on this thread.
+        state = g.pop("_profiling", None)
+        if state is not None and state["profiler"] is not None:
+            self._stop_profiler(state["profiler"])
+
+    def _budget_for(self, endpoint):
+        view = current_app.view_functions.get(endpoint)
+        budget = getattr(view, "_query_budget", None)
+        if budget is None:
+            budget = current_app.config.get("QUERY_BUDGET_DEFAULT")
+        return budget
+
+    # ---------------- Sampling profilers ----------------
+
+    def _start_profiler(self):
+        if current_app.config.get("PROFILER") == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                current_app.logger.warning("pyinstrument is not installed, falling back to cProfile")
+            else:
+                profiler = Profiler()
+                profiler.start()
+                return profiler
+
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _stop_profiler(self, profiler):
+        if hasattr(profiler, "output_text"):
+            profiler.stop()
+            return profiler.output_text()
+
+        import pstats
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(25)
+        return out.getvalue()
@@ -0,0 +1,112 @@
+import time
+
+import redis
+from flask import current_app
+
+from app.utils.redis_client import get_redis_client
+
+
+# Refill, then take ``requested`` tokens if available. Returns 0 when the
+# tokens were granted, otherwise how many ms to wait before trying again.
+# A provider back-off (set after a 429/421) blocks every caller until it ends.
+TOKEN_BUCKET_LUA = """
+local bucket = KEYS[1]
+local blocked = KEYS[2]
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local blocked_ms = redis.call('PTTL', blocked)
+if blocked_ms > 0 then
+    return blocked_ms
+end
+
+local state = redis.call('HMGET', bucket, 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * rate / 1000)
+
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = math.ceil((requested - tokens) * 1000 / rate)
+end
+
+redis.call('HSET', bucket, 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', bucket, math.ceil(capacity * 1000 / rate) + 1000)
+return wait
+"""
+
+# Channel -> (provider, config key prefix)
+PROVIDERS = {
+    "EMAIL": ("smtp", "RATE_LIMIT_EMAIL"),
+    "SMS": ("twilio", "RATE_LIMIT_SMS"),
+    "WHATSAPP": ("twilio", "RATE_LIMIT_WHATSAPP"),
+}
+
+
+class TokenBucketLimiter:
+    """Redis token bucket shared by every worker sending on one provider channel."""
+
+    def __init__(self, channel, rate, burst):
+        provider, _ = PROVIDERS[channel]
+        self.channel = channel
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.bucket_key = f"ratelimit:{provider}:{channel.lower()}"
+        self.blocked_key = f"{self.bucket_key}:blocked"
+        self.redis = get_redis_client()
+        self._script = self.redis.register_script(TOKEN_BUCKET_LUA)
+
+    @classmethod
+    def for_channel(cls, channel):
+        """Limiter configured for ``channel``, or None when limiting is off."""
+        config = current_app.config
+        if not config.get("RATE_LIMITING_ENABLED") or channel not in PROVIDERS:
+            return None
+
+        prefix = PROVIDERS[channel][1]
+        rate = config.get(f"{prefix}_PER_SEC") or 0
+        if rate <= 0:
+            return None
+
+        return cls(channel, rate, config.get(f"{prefix}_BURST") or 1)
+
+    def acquire(self, timeout=None):
+        """Block until a send is allowed. Returns False if ``timeout`` passes first.
+
+        Fails open (returns True) if Redis is unavailable.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        while True:
+            try:
+                wait_ms = int(self._script(keys=[self.bucket_key, self.blocked_key], args=[self.rate, self.burst, 1]))
+            except redis.RedisError:
+                current_app.logger.warning(f"Rate limiter unavailable for {self.channel}, sending unthrottled", exc_info=True)
+                return True
+
+            if wait_ms <= 0:
+                return True
+
+            wait = wait_ms / 1000
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+
+            time.sleep(wait)
+
+    def backoff(self, seconds):
+        """Pause every sender on this channel after the provider throttled us."""
+        pause_ms = max(1, int(seconds * 1000))
+        try:
+            if pause_ms > self.redis.pttl(self.blocked_key):
+                self.redis.set(self.blocked_key, "1", px=pause_ms)
+        except redis.RedisError:
+            current_app.logger.warning(f"Failed to record back-off for {self.channel}", exc_info=True)
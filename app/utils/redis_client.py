@@ -0,0 +1,35 @@
+import threading
+
+import redis
+from flask import current_app
+
+
+_lock = threading.Lock()
+_clients = {}
+
+
+def get_redis_client():
+    """Return the process-wide Redis client for the configured REDIS_URL.
+
+    The client shares one bounded, blocking connection pool across threads
+    (and greenlets under gevent) instead of opening a pool per request.
+    """
+    redis_url = current_app.config.get("REDIS_URL") or "redis://localhost:6379/0"
+
+    client = _clients.get(redis_url)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(redis_url)
+        if client is None:
+            pool = redis.BlockingConnectionPool.from_url(
+                redis_url,
+                max_connections=current_app.config.get("REDIS_MAX_CONNECTIONS", 10),
+                timeout=current_app.config.get("REDIS_POOL_TIMEOUT", 5),
+                decode_responses=True,
+            )
+            client = redis.Redis(connection_pool=pool)
+            _clients[redis_url] = client
+
+    return client
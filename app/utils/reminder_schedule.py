@@ -0,0 +1,237 @@
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, literal, or_, select
+
+from app import db
+from app.models import NotificationOutbox, Payment, PaymentStatus, Property, ReminderLog, ReminderRule, ReminderSchedule, Tenant
+from app.utils.db_insert import insert_ignore
+from app.utils.payments import refresh_tenant_rollups
+from app.utils.reminder_slots import DEFAULT_OFFSETS, arrears_label, due_date_for, parse_offsets, reminder_label
+
+
+def default_offsets():
+    value = current_app.config.get("REMINDER_DEFAULT_OFFSETS")
+    return parse_offsets(value) if value else list(DEFAULT_OFFSETS)
+
+
+def owner_offsets(owner_ids):
+    """{owner_id: [offsets]}; owners without rules get the default offsets."""
+    rules = {}
+    if owner_ids:
+        rows = (
+            db.session.query(ReminderRule.owner_id, ReminderRule.offset_days)
+            .filter(ReminderRule.owner_id.in_(owner_ids))
+        )
+        for owner_id, offset in rows:
+            rules.setdefault(owner_id, []).append(offset)
+
+    defaults = default_offsets()
+    return {owner_id: sorted(rules.get(owner_id, defaults)) for owner_id in owner_ids}
+
+
+def expand_schedule(*criteria, send_from=None):
+    """Expand owner rules into reminder_schedule rows for active tenants' PENDING payments matching ``criteria``.
+
+    Existing rows are left untouched, so this is safe to repeat. With
+    ``send_from``, rows that would be sent before that date are not created.
+    Returns the number of rows considered.
+    """
+    payments = (
+        db.session.query(Payment.id, Payment.month, Tenant.due_day, Tenant.start_date, Property.owner_id)
+        .join(Tenant, Payment.tenant_id == Tenant.id)
+        .join(Property, Tenant.property_id == Property.id)
+        .filter(Payment.status == PaymentStatus.PENDING, Tenant.is_active.is_(True), *criteria)
+        .all()
+    )
+
+    offsets = owner_offsets({p.owner_id for p in payments})
+
+    rows = []
+    for p in payments:
+        try:
+            due_on = due_date_for(p.month, p.due_day, p.start_date)
+        except (ValueError, TypeError):
+            current_app.logger.warning(f"Invalid due date for payment {p.id}")
+            continue
+
+        for offset in offsets[p.owner_id]:
+            send_on = due_on + timedelta(days=offset)
+            if send_from and send_on < send_from:
+                continue
+            rows.append({
+                "payment_id": p.id,
+                "reminder_type": reminder_label(offset),
+                "due_on": due_on,
+                "send_on": send_on,
+            })
+
+    insert_ignore(ReminderSchedule, rows, ["payment_id", "reminder_type"])
+    return len(rows)
+
+
+def close_schedule(*criteria):
+    """Mark open reminder rows matching ``criteria`` as processed so they never send."""
+    return (
+        ReminderSchedule.query
+        .filter(ReminderSchedule.processed_at.is_(None), *criteria)
+        .update({ReminderSchedule.processed_at: datetime.utcnow()}, synchronize_session=False)
+    )
+
+
+def consolidate_arrears(rows):
+    """Collapse due reminder rows into one reminder per tenant in arrears.
+
+    Returns [(row, reminder_type)]. Tenants with a single PENDING payment keep
+    their per-payment reminder; for tenants with several, the row of the latest
+    month anchors one ARREARS reminder listing every outstanding month.
+    """
+    tenant_ids = {row.payment.tenant_id for row in rows}
+    pending = {}
+    if tenant_ids:
+        pending = dict(
+            db.session.query(Payment.tenant_id, func.count(Payment.id))
+            .filter(Payment.tenant_id.in_(tenant_ids), Payment.status == PaymentStatus.PENDING)
+            .group_by(Payment.tenant_id)
+            .all()
+        )
+
+    selected = []
+    anchors = {}
+    for row in rows:
+        tenant_id = row.payment.tenant_id
+        if pending.get(tenant_id, 0) < 2:
+            selected.append((row, row.reminder_type))
+        elif tenant_id not in anchors or row.payment.month > anchors[tenant_id].payment.month:
+            anchors[tenant_id] = row
+
+    selected.extend((row, arrears_label(row.reminder_type)) for row in anchors.values())
+    return selected
+
+
+def reschedule_owner(owner_id):
+    """Rebuild the upcoming reminders of an owner's open payments after a rule change."""
+    today = date.today()
+    payment_ids = (
+        select(Payment.id)
+        .join(Tenant, Payment.tenant_id == Tenant.id)
+        .join(Property, Tenant.property_id == Property.id)
+        .where(Property.owner_id == owner_id, Payment.status == PaymentStatus.PENDING)
+    )
+
+    (
+        ReminderSchedule.query
+        .filter(
+            ReminderSchedule.processed_at.is_(None),
+            ReminderSchedule.send_on >= today,
+            ReminderSchedule.payment_id.in_(payment_ids)
+        )
+        .delete(synchronize_session=False)
+    )
+
+    return expand_schedule(Payment.id.in_(payment_ids), send_from=today)
+
+
+def reschedule_tenant(tenant_id):
+    """Rebuild a tenant's open reminders, e.g. after their due day changed.
+
+    Open rows carry the old due date, so they are dropped and expanded again
+    from today; reminders already sent keep their rows.
+    """
+    payment_ids = select(Payment.id).where(
+        Payment.tenant_id == tenant_id,
+        Payment.status == PaymentStatus.PENDING
+    )
+
+    (
+        ReminderSchedule.query
+        .filter(
+            ReminderSchedule.processed_at.is_(None),
+            ReminderSchedule.payment_id.in_(payment_ids)
+        )
+        .delete(synchronize_session=False)
+    )
+
+    return expand_schedule(Payment.tenant_id == tenant_id, send_from=date.today())
+
+
+def close_out_tenant(tenant_id):
+    """Stop all reminders for a deactivated tenant.
+
+    Pending payments for months after the current one are cancelled; earlier
+    ones stay PENDING as arrears but get no further reminders. Returns the
+    number of cancelled payments.
+    """
+    current_month = date.today().strftime("%Y-%m")
+    payment_ids = select(Payment.id).where(Payment.tenant_id == tenant_id)
+
+    cancelled = (
+        Payment.query
+        .filter(
+            Payment.tenant_id == tenant_id,
+            Payment.status == PaymentStatus.PENDING,
+            Payment.month > current_month
+        )
+        .update({Payment.status: PaymentStatus.CANCELLED}, synchronize_session=False)
+    )
+
+    close_schedule(ReminderSchedule.payment_id.in_(payment_ids))
+    refresh_tenant_rollups(Tenant.id == tenant_id)
+
+    (
+        NotificationOutbox.query
+        .filter(
+            NotificationOutbox.status == "PENDING",
+            NotificationOutbox.payment_id.in_(payment_ids)
+        )
+        .update(
+            {NotificationOutbox.status: "FAILED", NotificationOutbox.last_error: "Tenant inactive"},
+            synchronize_session=False
+        )
+    )
+
+    return cancelled
+
+
+def _reminder_sent(model):
+    """Whether ``model`` (outbox or log) has the reminder of the current schedule row, alone or in arrears."""
+    return (
+        select(model.id)
+        .where(
+            model.payment_id == ReminderSchedule.payment_id,
+            or_(
+                model.reminder_type == ReminderSchedule.reminder_type,
+                model.reminder_type == literal(arrears_label("")).concat(ReminderSchedule.reminder_type)
+            )
+        )
+        .exists()
+    )
+
+
+def reopen_tenant(tenant_id):
+    """Schedule upcoming reminders again for a reactivated tenant's open payments.
+
+    close_out_tenant closed every schedule row of the tenant; rows still ahead
+    of today whose reminder never went out are reopened, then rows missing for
+    newer payments are expanded. Returns the number of reopened rows.
+    """
+    today = date.today()
+    pending_ids = select(Payment.id).where(
+        Payment.tenant_id == tenant_id,
+        Payment.status == PaymentStatus.PENDING
+    )
+
+    reopened = (
+        ReminderSchedule.query
+        .filter(
+            ReminderSchedule.processed_at.isnot(None),
+            ReminderSchedule.send_on >= today,
+            ReminderSchedule.payment_id.in_(pending_ids),
+            ~_reminder_sent(NotificationOutbox),
+            ~_reminder_sent(ReminderLog)
+        )
+        .update({ReminderSchedule.processed_at: None}, synchronize_session=False)
+    )
+
+    expand_schedule(Payment.tenant_id == tenant_id, send_from=today)
+    return reopened
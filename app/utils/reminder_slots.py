@@ -0,0 +1,121 @@
+import zlib
+from calendar import monthrange
+from datetime import date, datetime, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+# Tenants hash into a fixed number of buckets; a slot owns a contiguous range
+# of buckets, so changing REMINDER_SLOTS never needs a backfill and the slot
+# filter is an index range scan on tenants.reminder_bucket.
+SHARD_BUCKETS = 1024
+
+
+def reminder_bucket(tenant_id):
+    """Stable bucket (0..SHARD_BUCKETS-1) for a tenant id."""
+    return zlib.crc32(str(tenant_id).encode()) % SHARD_BUCKETS
+
+
+def bucket_range(slot, slot_count):
+    """Half-open bucket range [lo, hi) processed by ``slot`` of ``slot_count``."""
+    lo = slot * SHARD_BUCKETS // slot_count
+    hi = (slot + 1) * SHARD_BUCKETS // slot_count
+    return lo, hi
+
+
+def split_range(lo, hi, parts):
+    """Split [lo, hi) into at most ``parts`` contiguous, non-empty ranges."""
+    parts = max(1, min(parts, hi - lo))
+    bounds = [lo + (hi - lo) * i // parts for i in range(parts + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+# Offsets (days from the due date) used for owners without their own rules.
+DEFAULT_OFFSETS = (-2, 0, 3)
+MIN_OFFSET, MAX_OFFSET = -15, 31
+
+
+def parse_offsets(value):
+    """Parse "-2,0,3" or a list into sorted, unique offsets. Raises ValueError."""
+    items = value.split(",") if isinstance(value, str) else (value or [])
+    offsets = set()
+    for item in items:
+        if isinstance(item, str) and not item.strip():
+            continue
+        offset = int(item)
+        if not MIN_OFFSET <= offset <= MAX_OFFSET:
+            raise ValueError(f"Reminder offsets must be between {MIN_OFFSET} and {MAX_OFFSET} days")
+        offsets.add(offset)
+    return sorted(offsets)
+
+
+def reminder_label(offset):
+    """Outbox/log label for an offset: BEFORE, ON, AFTER for the defaults, e.g. AFTER+7 otherwise."""
+    kind = "BEFORE" if offset < 0 else "AFTER" if offset > 0 else "ON"
+    return kind if offset in DEFAULT_OFFSETS else f"{kind}{offset:+d}"
+
+
+def reminder_kind(label):
+    """Template kind (ARREARS / BEFORE / ON / AFTER) of a reminder label."""
+    for kind in ("ARREARS", "BEFORE", "AFTER", "ON"):
+        if label.startswith(kind):
+            return kind
+    raise ValueError(f"Unknown reminder type: {label}")
+
+
+def arrears_label(label):
+    """Label of a consolidated reminder triggered by the ``label`` rule, e.g. ARREARS:AFTER."""
+    return f"ARREARS:{label}"
+
+
+def due_date_for(month, due_day, start_date=None):
+    """Due date of a "YYYY-MM" payment, clamped to the month's last day.
+
+    A tenancy starting after that day (a prorated first month) is due on its
+    start date instead.
+    """
+    year, month = map(int, month.split("-"))
+    due_date = date(year, month, min(due_day, monthrange(year, month)[1]))
+    return max(due_date, start_date) if start_date else due_date
+
+
+def parse_slots(value):
+    """Parse "09:00,11:30" into minutes after local midnight, sorted."""
+    slots = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        hour, minute = map(int, item.split(":"))
+        if not (0 <= hour < 24 and 0 <= minute < 60):
+            raise ValueError(f"Invalid reminder slot: {item}")
+        slots.append(hour * 60 + minute)
+    return sorted(slots)
+
+
+def is_valid_timezone(name):
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+    return True
+
+
+def due_slots(timezones, slots, tick_minutes, now=None):
+    """(timezone, slot index) pairs whose local start time falls in the current tick.
+
+    Called once per tick; a slot fires in the tick that contains its start
+    time in each owner time zone.
+    """
+    now = now or datetime.now(timezone.utc)
+    due = []
+
+    for name in timezones:
+        local = now.astimezone(ZoneInfo(name))
+        minutes = local.hour * 60 + local.minute
+        tick_start = minutes - minutes % tick_minutes
+
+        for index, slot in enumerate(slots):
+            if tick_start <= slot < tick_start + tick_minutes:
+                due.append((name, index))
+
+    return due
@@ -0,0 +1,109 @@
+import threading
+import uuid
+from functools import wraps
+
+import redis
+from flask import current_app
+
+from app.utils.redis_client import get_redis_client
+
+
+# Only the holder (matching token) may extend or release the lease.
+RENEW_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class TaskLease:
+    """Redis lease held for the duration of a task run.
+
+    The lease expires after ``ttl`` seconds unless renewed; a heartbeat thread
+    renews it every ``ttl / 3`` seconds while the task runs, so a crashed
+    worker frees the lock quickly but a long run keeps it.
+    """
+
+    def __init__(self, name, ttl=60):
+        self.key = f"tasklock:{name}"
+        self.ttl_ms = int(ttl * 1000)
+        self.token = uuid.uuid4().hex
+        self.redis = get_redis_client()
+        self.lost = False
+        self._stop = threading.Event()
+        self._heartbeat = None
+        self._logger = current_app.logger
+
+    def acquire(self):
+        if not self.redis.set(self.key, self.token, nx=True, px=self.ttl_ms):
+            return False
+
+        self._heartbeat = threading.Thread(target=self._renew, name=f"lease-{self.key}", daemon=True)
+        self._heartbeat.start()
+        return True
+
+    def _renew(self):
+        renew = self.redis.register_script(RENEW_LUA)
+        while not self._stop.wait(self.ttl_ms / 3000):
+            try:
+                if not renew(keys=[self.key], args=[self.token, self.ttl_ms]):
+                    self.lost = True
+                    self._logger.warning(f"Lease {self.key} was lost; another run may start")
+                    return
+            except redis.RedisError:
+                self._logger.warning(f"Failed to renew lease {self.key}", exc_info=True)
+
+    def release(self):
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+        try:
+            self.redis.register_script(RELEASE_LUA)(keys=[self.key], args=[self.token])
+        except redis.RedisError:
+            self._logger.warning(f"Failed to release lease {self.key}; it expires on its own", exc_info=True)
+
+
+def singleton(key=None):
+    """Skip a task run while another run with the same lock key holds the lease.
+
+    ``key(*args, **kwargs)`` names the lock (default: the task name only), so
+    e.g. each reminder shard gets its own lock. A skipped run returns
+    ``{"skipped": 1}``. Disabled with TASK_LOCKS_ENABLED=False; if Redis is
+    unreachable the task runs unlocked.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            config = current_app.config
+            if not config.get("TASK_LOCKS_ENABLED", True):
+                return fn(*args, **kwargs)
+
+            task_args = args[1:] if args and hasattr(args[0], "request") else args
+            name = fn.__name__ + (f":{key(*task_args, **kwargs)}" if key else "")
+            lease = TaskLease(name, ttl=config.get("TASK_LOCK_TTL_SECONDS", 60))
+
+            try:
+                acquired = lease.acquire()
+            except redis.RedisError:
+                current_app.logger.warning(f"Task lock unavailable for {name}, running unlocked", exc_info=True)
+                return fn(*args, **kwargs)
+
+            if not acquired:
+                current_app.logger.info(f"Skipping {name}: another run holds the lock")
+                return {"skipped": 1}
+
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                lease.release()
+
+        return wrapper
+    return decorator
@@ -0,0 +1,177 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, func
+
+from app import db
+from app.models import TaskRun
+from app.utils.metrics import registry
+
+
+TASK_DURATION = registry.histogram(
+    "celery_task_duration_seconds",
+    "Wall time of instrumented Celery task runs.",
+    buckets=(0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600, 1800),
+)
+TASK_STAGE = registry.histogram(
+    "celery_task_stage_seconds",
+    "Wall time spent per stage of instrumented Celery task runs.",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 15, 60, 300),
+)
+SEND_LATENCY = registry.histogram(
+    "notification_send_seconds",
+    "Latency of individual notification sends.",
+)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class TaskRunRecorder:
+    """Collect per-stage timings and counts for one task run.
+
+    Stages may be entered many times (e.g. once per payment inside a loop);
+    their durations are summed. ``finish`` logs one structured line,
+    persists a ``TaskRun`` row and feeds the in-process histograms.
+    """
+
+    def __init__(self, task_name, task_id=None):
+        self.task_name = task_name
+        self.task_id = task_id
+        self.started_at = datetime.utcnow()
+        self._start = time.perf_counter()
+        self.stages = {}
+        self.counts = {}
+        self.send_latencies = []
+        # Sends may be timed from several pool threads at once.
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - start)
+
+    @contextmanager
+    def send(self, channel):
+        """Time a single outbound send, counted under the ``send_<channel>`` stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            stage = f"send_{channel.lower()}"
+            with self._lock:
+                self.stages[stage] = self.stages.get(stage, 0.0) + elapsed
+                self.send_latencies.append(elapsed)
+            SEND_LATENCY.observe(elapsed, channel=channel)
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def did_work(self):
+        return bool(self.send_latencies) or any(self.counts.values())
+
+    def finish(self, status="SUCCESS"):
+        duration = time.perf_counter() - self._start
+        p50 = percentile(self.send_latencies, 50)
+        p99 = percentile(self.send_latencies, 99)
+
+        stages_ms = {name: round(seconds * 1000, 2) for name, seconds in self.stages.items()}
+
+        current_app.logger.info("task_run %s", json.dumps({
+            "task": self.task_name,
+            "task_id": self.task_id,
+            "status": status,
+            "duration_ms": round(duration * 1000, 2),
+            "stages_ms": stages_ms,
+            "counts": self.counts,
+            "send_p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+            "send_p99_ms": round(p99 * 1000, 2) if p99 is not None else None,
+        }))
+
+        TASK_DURATION.observe(duration, task=self.task_name, status=status)
+        for name, seconds in self.stages.items():
+            TASK_STAGE.observe(seconds, task=self.task_name, stage=name)
+
+        # Idle polls (e.g. an empty outbox every minute) are logged but not stored.
+        if status == "SUCCESS" and not self.did_work():
+            return
+
+        try:
+            db.session.add(TaskRun(
+                task_name=self.task_name,
+                task_id=self.task_id,
+                status=status,
+                started_at=self.started_at,
+                duration_ms=duration * 1000,
+                stages=stages_ms,
+                counts=self.counts,
+                send_p50_ms=p50 * 1000 if p50 is not None else None,
+                send_p99_ms=p99 * 1000 if p99 is not None else None,
+            ))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            current_app.logger.warning("Failed to persist task run metrics", exc_info=True)
+
+
+def collect_task_runs():
+    """Expose the latest persisted run of every task (collector for /metrics).
+
+    One query: the newest started_at per task, joined back to its row.
+    """
+    latest = (
+        db.session.query(TaskRun.task_name, func.max(TaskRun.started_at).label("started_at"))
+        .group_by(TaskRun.task_name)
+        .subquery()
+    )
+    rows = (
+        TaskRun.query
+        .join(latest, and_(TaskRun.task_name == latest.c.task_name, TaskRun.started_at == latest.c.started_at))
+        .all()
+    )
+    runs = {run.task_name: run for run in rows}
+
+    duration, timestamp, stages, counts, latency = [], [], [], [], []
+
+    for name, run in sorted(runs.items()):
+        labels = {"task": name, "status": run.status}
+        duration.append((labels, (run.duration_ms or 0) / 1000))
+        timestamp.append(({"task": name}, (run.started_at - datetime(1970, 1, 1)).total_seconds()))
+
+        for stage, ms in (run.stages or {}).items():
+            stages.append(({"task": name, "stage": stage}, ms / 1000))
+        for counter, value in (run.counts or {}).items():
+            counts.append(({"task": name, "name": counter}, value))
+        if run.send_p50_ms is not None:
+            latency.append(({"task": name, "quantile": "0.5"}, run.send_p50_ms / 1000))
+        if run.send_p99_ms is not None:
+            latency.append(({"task": name, "quantile": "0.99"}, run.send_p99_ms / 1000))
+
+    return [
+        ("celery_task_last_run_duration_seconds", "gauge", "Duration of the latest run per task.", duration),
+        ("celery_task_last_run_timestamp_seconds", "gauge", "Start time of the latest run per task.", timestamp),
+        ("celery_task_last_run_stage_seconds", "gauge", "Per-stage time of the latest run per task.", stages),
+        ("celery_task_last_run_count", "gauge", "Counts recorded by the latest run per task.", counts),
+        ("celery_task_last_run_send_latency_seconds", "gauge", "Per-send latency quantiles of the latest run.", latency),
+    ]
+
+
+def prune_task_runs(retention_days):
+    """Delete persisted task runs older than ``retention_days``. Returns the number deleted."""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    deleted = TaskRun.query.filter(TaskRun.started_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
@@ -1,13 +1,11 @@
-import redis
-from flask import current_app
+from app.utils.redis_client import get_redis_client
 
 
 class TokenBlacklist:
     """Manage JWT blacklist in Redis."""
 
     def __init__(self):
-        redis_url = current_app.config.get("REDIS_URL", "redis://localhost:6379/0")
-        self.redis = redis.Redis.from_url(redis_url, decode_responses=True)
+        self.redis = get_redis_client()
 
     def add(self, jti, expires_in):
         """Add JWT ID to Redis with expiration time."""
@@ -0,0 +1,314 @@
+import os
+import random
+import smtplib
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import current_app
+from flask_mail import Message
+from requests.adapters import HTTPAdapter
+from twilio.base.exceptions import TwilioRestException
+from twilio.http.http_client import TwilioHttpClient
+from twilio.rest import Client
+
+from app import mail
+from app.config import Config
+from app.utils.rate_limiter import TokenBucketLimiter
+
+
+# =====================================================
+# Errors
+# =====================================================
+
+class TransportError(Exception):
+    """A send failed. ``status`` carries the provider code when known."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class RateLimited(TransportError):
+    """The provider throttled us (Twilio 429, SMTP 421/450/451/452)."""
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message, status)
+        self.retry_after = retry_after
+
+
+SMTP_THROTTLE_CODES = {421, 450, 451, 452}
+
+
+# =====================================================
+# Live Transports
+# =====================================================
+
+class SmtpTransport:
+    """Send through Flask-Mail; with ``connection`` every message reuses that SMTP session."""
+    channel = "EMAIL"
+
+    def __init__(self, connection=None):
+        self.connection = connection
+
+    def send(self, to, body, subject=None):
+        msg = Message(subject=subject, recipients=[to], body=body)
+        try:
+            (self.connection or mail).send(msg)
+        except smtplib.SMTPResponseException as e:
+            if e.smtp_code in SMTP_THROTTLE_CODES:
+                raise RateLimited(str(e), status=e.smtp_code) from e
+            raise TransportError(str(e), status=e.smtp_code) from e
+        return msg
+
+
+_twilio_lock = threading.Lock()
+_twilio_client = None
+_twilio_pid = None
+
+
+def get_twilio_client():
+    """Return the Twilio client shared by every task and thread of this process.
+
+    It keeps one keep-alive HTTPS session whose connection pool is capped at
+    TWILIO_HTTP_POOL_SIZE, so sends reuse TLS connections and the number of
+    sockets to the provider stays bounded. A forked child builds its own.
+    """
+    global _twilio_client, _twilio_pid
+
+    pid = os.getpid()
+    if _twilio_client is not None and _twilio_pid == pid:
+        return _twilio_client
+
+    with _twilio_lock:
+        if _twilio_client is None or _twilio_pid != pid:
+            http_client = TwilioHttpClient(
+                pool_connections=True,
+                timeout=Config.TWILIO_HTTP_TIMEOUT,
+            )
+            http_client.session.mount("https://", HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=Config.TWILIO_HTTP_POOL_SIZE,
+                pool_block=True,
+            ))
+
+            _twilio_client = Client(
+                Config.TWILIO_ACCOUNT_SID,
+                Config.TWILIO_AUTH_TOKEN,
+                http_client=http_client,
+            )
+            _twilio_pid = pid
+
+    return _twilio_client
+
+
+class TwilioTransport:
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    @property
+    def client(self):
+        return get_twilio_client()
+
+    def send(self, to, body, subject=None):
+        if self.channel == "WHATSAPP":
+            from_, to = Config.TWILIO_WHATSAPP_NUMBER, f"whatsapp:{to}"
+        else:
+            from_ = Config.TWILIO_PHONE_NUMBER
+
+        try:
+            return self.client.messages.create(body=body, from_=from_, to=to)
+        except TwilioRestException as e:
+            if e.status == 429:
+                raise RateLimited(str(e), status=429) from e
+            raise TransportError(str(e), status=e.status) from e
+
+
+# =====================================================
+# Fake Transport (offline / load testing)
+# =====================================================
+
+class FakeReceipt:
+
+    def __init__(self, channel):
+        self.sid = f"FAKE{channel[:2]}{uuid.uuid4().hex[:24]}"
+
+
+class FakeTransport:
+    """Records messages instead of sending them.
+
+    Latency, error rate and rate-limit responses are injectable and driven
+    by a seeded RNG, so a run with the same settings is reproducible.
+    """
+
+    def __init__(self, channel, latency_ms=0, jitter_ms=0, error_rate=0.0, rate_limit_rate=0.0, seed=None):
+        self.channel = channel
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.sent = []
+        self.attempts = 0
+        self.failures = 0
+        self.throttled = 0
+
+    def _roll(self):
+        with self._lock:
+            self.attempts += 1
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+            return self._rng.random(), max(0.0, (self.latency_ms + jitter) / 1000)
+
+    def send(self, to, body, subject=None):
+        roll, delay = self._roll()
+        if delay:
+            time.sleep(delay)
+
+        if roll < self.rate_limit_rate:
+            with self._lock:
+                self.throttled += 1
+            status = 421 if self.channel == "EMAIL" else 429
+            raise RateLimited(f"Fake {self.channel} rate limit", status=status, retry_after=1)
+
+        if roll < self.rate_limit_rate + self.error_rate:
+            with self._lock:
+                self.failures += 1
+            raise TransportError(f"Fake {self.channel} failure", status=500)
+
+        receipt = FakeReceipt(self.channel)
+        with self._lock:
+            self.sent.append({
+                "sid": receipt.sid,
+                "channel": self.channel,
+                "to": to,
+                "subject": subject,
+                "body": body,
+                "sent_at": datetime.utcnow(),
+            })
+        return receipt
+
+    def reset(self):
+        with self._lock:
+            self.sent.clear()
+            self.attempts = self.failures = self.throttled = 0
+
+
+# =====================================================
+# Rate Limiting
+# =====================================================
+
+class RateLimitedTransport:
+    """Pace sends through the provider's shared token bucket.
+
+    Throttling responses pause every sender on the channel (``Retry-After``
+    or exponential back-off) and the message is retried here, instead of
+    failing and re-running the whole task.
+    """
+
+    def __init__(self, transport, limiter, max_retries=5, backoff_seconds=2.0):
+        self.transport = transport
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+
+    @property
+    def channel(self):
+        return self.transport.channel
+
+    def send(self, to, body, subject=None):
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                return self.transport.send(to=to, body=body, subject=subject)
+            except RateLimited as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                delay = e.retry_after or self.backoff_seconds * 2 ** (attempt - 1)
+                current_app.logger.warning(
+                    f"{self.channel} throttled (status {e.status}), backing off {delay}s (attempt {attempt})"
+                )
+                self.limiter.backoff(delay)
+
+
+# =====================================================
+# Registry
+# =====================================================
+
+CHANNELS = ("EMAIL", "SMS", "WHATSAPP")
+
+_fakes = {}
+_fakes_lock = threading.Lock()
+
+
+def _fake_from_config(channel):
+    config = current_app.config
+    return FakeTransport(
+        channel,
+        latency_ms=config.get("FAKE_TRANSPORT_LATENCY_MS", 0),
+        jitter_ms=config.get("FAKE_TRANSPORT_JITTER_MS", 0),
+        error_rate=config.get("FAKE_TRANSPORT_ERROR_RATE", 0.0),
+        rate_limit_rate=config.get("FAKE_TRANSPORT_RATE_LIMIT_RATE", 0.0),
+        seed=config.get("FAKE_TRANSPORT_SEED"),
+    )
+
+
+def get_fake_transport(channel):
+    """Process-wide fake for ``channel`` (created from config on first use)."""
+    with _fakes_lock:
+        transport = _fakes.get(channel)
+        if transport is None:
+            transport = _fakes[channel] = _fake_from_config(channel)
+        return transport
+
+
+def configure_fake_transport(channel, **settings):
+    """Replace the fake for ``channel``, e.g. from a benchmark."""
+    with _fakes_lock:
+        _fakes[channel] = FakeTransport(channel, **settings)
+        return _fakes[channel]
+
+
+def _rate_limited(channel, transport):
+    limiter = TokenBucketLimiter.for_channel(channel)
+    if limiter is None:
+        return transport
+
+    return RateLimitedTransport(
+        transport,
+        limiter,
+        max_retries=current_app.config.get("RATE_LIMIT_MAX_RETRIES", 5),
+        backoff_seconds=current_app.config.get("RATE_LIMIT_BACKOFF_SECONDS", 2.0),
+    )
+
+
+def get_transport(channel):
+    if current_app.config.get("NOTIFICATION_TRANSPORT") == "fake":
+        transport = get_fake_transport(channel)
+    elif channel == "EMAIL":
+        transport = SmtpTransport()
+    else:
+        transport = TwilioTransport(channel)
+
+    return _rate_limited(channel, transport)
+
+
+@contextmanager
+def email_batch():
+    """Email transport for a batch of messages sent over one SMTP connection.
+
+    ``mail.send`` opens and closes a connection (TCP + TLS + AUTH) per
+    message; a batch pays that once and Flask-Mail reconnects after
+    MAIL_MAX_EMAILS messages.
+    """
+    if current_app.config.get("NOTIFICATION_TRANSPORT") == "fake":
+        yield get_transport("EMAIL")
+        return
+
+    with mail.connect() as connection:
+        yield _rate_limited("EMAIL", SmtpTransport(connection))
@@ -0,0 +1,113 @@
+"""
+Compare the entity-based read path with the column-projection read path
+used by the list endpoints (rows/sec and peak memory).
+
+Usage:
+    python benchmarks/bench_projection.py --tenants 2000 --months 12
+"""
+import argparse
+import time
+import tracemalloc
+
+import harness
+
+harness.configure()
+
+from app import create_app, db  # noqa: E402
+from app.models import Property, Tenant, Payment  # noqa: E402
+from seed import seed  # noqa: E402
+
+
+def entity_path(owner_id):
+    payments = (
+        Payment.query
+        .join(Tenant)
+        .join(Property)
+        .filter(Property.owner_id == owner_id)
+        .all()
+    )
+    return [
+        {
+            "id": str(p.id),
+            "tenant": p.tenant.name,
+            "phone": p.tenant.phone,
+            "total": p.rent_amount + p.maintenance_amount,
+            "status": p.status.value,
+        }
+        for p in payments
+    ]
+
+
+def projection_path(owner_id):
+    payments = (
+        db.session.query(
+            Payment.id,
+            Payment.rent_amount,
+            Payment.maintenance_amount,
+            Payment.status,
+            Tenant.name.label("tenant_name"),
+            Tenant.phone
+        )
+        .join(Tenant, Payment.tenant_id == Tenant.id)
+        .join(Property, Tenant.property_id == Property.id)
+        .filter(Property.owner_id == owner_id)
+        .all()
+    )
+    return [
+        {
+            "id": str(p.id),
+            "tenant": p.tenant_name,
+            "phone": p.phone,
+            "total": p.rent_amount + p.maintenance_amount,
+            "status": p.status.value,
+        }
+        for p in payments
+    ]
+
+
+def measure(fn, owner_id, repeat):
+    rows = 0
+    elapsed = 0.0
+    peak = 0
+
+    for _ in range(repeat):
+        # Each run starts from an empty identity map, like a fresh request.
+        db.session.expunge_all()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        rows = len(fn(owner_id))
+        elapsed += time.perf_counter() - start
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {
+        "rows": rows,
+        "rows_per_sec": round(rows * repeat / elapsed, 1) if elapsed else 0.0,
+        "peak_mem_kb": round(peak / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tenants", type=int, default=1000)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        owner_id = seed(owners=1, properties=1, tenants=args.tenants, months=args.months)[0]
+
+        results = {
+            "entity": measure(entity_path, owner_id, args.repeat),
+            "projection": measure(projection_path, owner_id, args.repeat),
+        }
+
+    for name, r in results.items():
+        print(f"{name:<11} rows={r['rows']:<8} rows/sec={r['rows_per_sec']:<12} peak_mem={r['peak_mem_kb']} KiB")
+
+
+if __name__ == "__main__":
+    main()
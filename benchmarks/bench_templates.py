@@ -0,0 +1,113 @@
+"""
+Compare inline f-string notification bodies with the precompiled template
+registry: renders/sec for a bulk reminder run, and billed SMS segments.
+
+Usage:
+    python benchmarks/bench_templates.py --messages 50000
+"""
+import argparse
+import time
+
+import harness
+
+harness.configure()
+
+from app import create_app  # noqa: E402
+from app.utils.message_templates import precompile, render_message, sms_segments  # noqa: E402
+
+
+def legacy_email(ctx):
+    # The bodies built inline before the template registry existed.
+    body = f"""
+Hello {ctx['name']},
+
+This is a reminder regarding your rent payment.
+
+Month : {ctx['month']}
+Amount : ₹{ctx['total']}
+Status : {ctx['status']}
+
+Please make the payment as soon as possible.
+
+Thank you,
+RemindMyRent
+"""
+    return "Rent Due Today", body
+
+
+def legacy_tenant_sms(ctx):
+    return f"""
+        Hello {ctx['name']},
+
+        You have been added as a tenant(Kirayedar) for {ctx['property_name']}.
+
+        Rent Amount: ₹{ctx['rent_amount']}
+        Maintenance Amount: ₹{ctx['maintenance_amount']}
+        Due Date: {ctx['due_day']}
+
+        Thank you.
+        """
+
+
+def contexts(n):
+    for i in range(n):
+        yield {
+            "name": f"Tenant {i}",
+            "month": "2026-10",
+            "total": 12000.0 + i % 5000,
+            "status": "PENDING",
+            "due_date": f"{i % 28 + 1:02d} Oct",
+            "property_name": f"Property {i % 50}",
+            "rent_amount": 12000.0 + i % 5000,
+            "maintenance_amount": 500.0,
+            "due_day": i % 28 + 1,
+        }
+
+
+def measure(fn, items):
+    start = time.perf_counter()
+    for ctx in items:
+        fn(ctx)
+    elapsed = time.perf_counter() - start
+    return round(len(items) / elapsed, 1) if elapsed else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+
+    items = list(contexts(args.messages))
+
+    app = create_app()
+    with app.app_context():
+        start = time.perf_counter()
+        precompile()
+        compile_ms = round((time.perf_counter() - start) * 1000, 2)
+
+        results = {
+            "email_fstring": measure(legacy_email, items),
+            "email_registry": measure(lambda ctx: render_message("rent_on", "EMAIL", "en", **ctx), items),
+            "sms_registry": measure(lambda ctx: render_message("rent_on", "SMS", "en", **ctx), items),
+        }
+
+        sample = items[:1000]
+        segments = {
+            "tenant_added_sms_legacy": sum(sms_segments(legacy_tenant_sms(ctx)) for ctx in sample) / len(sample),
+            "tenant_added_sms_registry": sum(
+                sms_segments(render_message("tenant_added", "SMS", "en", **ctx).body) for ctx in sample
+            ) / len(sample),
+            "rent_reminder_sms_registry": sum(
+                sms_segments(render_message("rent_after", "SMS", "en", **ctx).body) for ctx in sample
+            ) / len(sample),
+        }
+
+    print(f"precompile: {compile_ms} ms")
+    for name, rate in results.items():
+        print(f"{name:<16} {rate:>12} renders/sec")
+    for name, avg in segments.items():
+        print(f"{name:<28} {avg:.2f} segments/message")
+
+
+if __name__ == "__main__":
+    main()
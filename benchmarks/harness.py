@@ -0,0 +1,157 @@
+"""
+Measurement helpers shared by the benchmarks.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def configure(database_url=None):
+    """Point the app at a benchmark database and stub external services.
+
+    Must run before anything imports ``app``.
+    """
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+    if not database_url:
+        db_file = os.path.join(tempfile.mkdtemp(prefix="rmr-bench-"), "bench.db")
+        database_url = f"sqlite:///{db_file}"
+
+    os.environ["SQLALCHEMY_DATABASE_URI"] = database_url
+    os.environ.setdefault("JWT_SECRET_KEY", "bench-secret")
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    # Notifications go to the in-process fake transport, never to SMTP/Twilio.
+    os.environ.setdefault("NOTIFICATION_TRANSPORT", "fake")
+    os.environ.setdefault("MAIL_SUPPRESS_SEND", "True")
+    os.environ.setdefault("MAIL_DEFAULT_SENDER", "bench@bench.local")
+    # No Redis needed for token checks, outbound rate limiting or task locks.
+    os.environ.setdefault("JWT_BLACKLIST_ENABLED", "False")
+    os.environ.setdefault("RATE_LIMITING_ENABLED", "False")
+    os.environ.setdefault("TASK_LOCKS_ENABLED", "False")
+    # Run follow-up tasks (e.g. outbox dispatch) inline instead of via a broker.
+    os.environ.setdefault("CELERY_TASK_ALWAYS_EAGER", "True")
+    return database_url
+
+
+class QueryCounter:
+    """Count SQL statements executed on ``engine`` while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        from sqlalchemy import event
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        from sqlalchemy import event
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def run_benchmark(fn, engine, repeat=5, setup=None, items=None):
+    """Time ``fn`` ``repeat`` times, then run it once more under tracemalloc.
+
+    ``setup`` runs untimed before every call. ``items(result)`` may return the
+    number of rows/messages processed by a call, reported as items/sec.
+    Timings of a benchmark with ``errors`` are not meaningful; see
+    :func:`failed`.
+    """
+    from app.utils.task_metrics import percentile
+
+    latencies, processed, errors, queries = [], 0, 0, 0
+
+    with QueryCounter(engine) as counter:
+        for _ in range(repeat):
+            if setup:
+                setup()
+            queries_before = counter.count
+            start = time.perf_counter()
+            try:
+                result = fn()
+            except Exception as e:
+                errors += 1
+                result = None
+                print(f"  error: {type(e).__name__}: {e}", file=sys.stderr)
+            latencies.append(time.perf_counter() - start)
+            queries = counter.count - queries_before
+            if items and result is not None:
+                processed += items(result)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+    except Exception:
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    total = sum(latencies)
+    report = {
+        "runs": repeat,
+        "errors": errors,
+        "ops_per_sec": round(repeat / total, 2) if total else 0.0,
+        "p50_ms": round((percentile(latencies, 50) or 0) * 1000, 2),
+        "p95_ms": round((percentile(latencies, 95) or 0) * 1000, 2),
+        "p99_ms": round((percentile(latencies, 99) or 0) * 1000, 2),
+        "queries_per_op": queries,
+        "peak_mem_kb": round(peak / 1024, 1),
+    }
+    if items:
+        report["items_per_sec"] = round(processed / total, 1) if total else 0.0
+    return report
+
+
+def failed(report):
+    """Names of benchmarks in ``report`` that raised on any call."""
+    return [name for name, result in report["results"].items() if result.get("errors")]
+
+
+# Lower is better for these, higher is better for the rest.
+_LOWER_IS_BETTER = {"p50_ms", "p95_ms", "p99_ms", "queries_per_op", "peak_mem_kb"}
+
+
+def compare(report, baseline, threshold_pct):
+    """Return (lines, regressions) comparing ``report`` to ``baseline``."""
+    lines, regressions = [], []
+
+    for name, current in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            lines.append(f"{name}: no baseline")
+            continue
+
+        for metric in ("ops_per_sec", "p95_ms", "queries_per_op", "peak_mem_kb"):
+            old, new = base.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            worse = change > threshold_pct if metric in _LOWER_IS_BETTER else change < -threshold_pct
+            lines.append(f"{name:<28} {metric:<15} {old:>10} -> {new:>10} ({change:+.1f}%){'  REGRESSION' if worse else ''}")
+            if worse:
+                regressions.append((name, metric, change))
+
+    return lines, regressions
+
+
+def load_json(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as fh:
+        json.dump(data, fh, indent=2, sort_keys=True)
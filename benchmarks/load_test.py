@@ -0,0 +1,141 @@
+"""
+Closed-loop HTTP load test for the web tier.
+
+Runs CONCURRENCY clients against one path for DURATION seconds and reports
+throughput and latency percentiles. With --spawn it starts gunicorn once per
+worker class (using gunicorn.conf.py) so the modes can be compared on the
+same machine, e.g.:
+
+    python benchmarks/load_test.py --spawn sync,gthread,gevent --path /smtp-test
+
+`/smtp-test` opens a socket to smtp.gmail.com, so it is a good stand-in for a
+route dominated by outbound I/O latency.
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_load(url, concurrency, duration, timeout):
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    from app.utils.task_metrics import percentile
+
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client():
+        local, failed = [], 0
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(url, timeout=timeout) as resp:
+                    resp.read()
+            except urllib.error.HTTPError:
+                # The server answered; that still counts towards throughput.
+                pass
+            except Exception:
+                failed += 1
+                continue
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round((percentile(latencies, 50) or 0) * 1000, 1),
+        "p95_ms": round((percentile(latencies, 95) or 0) * 1000, 1),
+        "p99_ms": round((percentile(latencies, 99) or 0) * 1000, 1),
+    }
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def spawn_gunicorn(worker_class, port, workers):
+    env = dict(
+        os.environ,
+        GUNICORN_WORKER_CLASS=worker_class,
+        WEB_CONCURRENCY=str(workers),
+        PORT=str(port),
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "run:app"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    if not wait_for_port(port):
+        proc.kill()
+        raise RuntimeError(f"gunicorn ({worker_class}) did not start on port {port}")
+    return proc
+
+
+def print_result(label, r):
+    print(
+        f"{label:<10} requests={r['requests']:<7} errors={r['errors']:<5} "
+        f"rps={r['rps']:<8} p50={r['p50_ms']}ms p95={r['p95_ms']}ms p99={r['p99_ms']}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Full URL of an already running server")
+    parser.add_argument("--path", default="/smtp-test")
+    parser.add_argument("--spawn", help="Comma separated worker classes to start, e.g. sync,gthread,gevent")
+    parser.add_argument("--port", type=int, default=18000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    if not args.spawn:
+        url = args.url or f"http://127.0.0.1:{args.port}{args.path}"
+        print_result("target", run_load(url, args.concurrency, args.duration, args.timeout))
+        return
+
+    for worker_class in args.spawn.split(","):
+        worker_class = worker_class.strip()
+        proc = spawn_gunicorn(worker_class, args.port, args.workers)
+        try:
+            url = f"http://127.0.0.1:{args.port}{args.path}"
+            print_result(worker_class, run_load(url, args.concurrency, args.duration, args.timeout))
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    main()
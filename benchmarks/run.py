@@ -0,0 +1,222 @@
+"""
+Reproducible benchmark suite for the API and the Celery tasks.
+
+Seeds a synthetic dataset into a fresh SQLite file (or --database-url, e.g. a
+local PostgreSQL) and reports throughput, latency percentiles, SQL statements
+per operation and peak memory for each benchmark.
+
+    python benchmarks/run.py --owners 20 --tenants 50 --output bench_output.json
+    python benchmarks/run.py --baseline benchmarks/baselines/sqlite.json --fail-on-regression 15
+    python benchmarks/run.py --save-baseline benchmarks/baselines/sqlite.json
+"""
+import argparse
+import os
+import platform
+import sys
+from datetime import date, datetime
+
+import harness
+
+
+def build_benchmarks(app, client, owner_id):
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import select
+
+    from app import db
+    from app.models import NotificationOutbox, Payment, ReminderLog, ReminderSchedule
+    from app.tasks import dispatch_notifications, generate_monthly_payments, send_rent_reminder_shard
+    from app.utils.reminder_slots import SHARD_BUCKETS
+
+    with app.app_context():
+        token = create_access_token(identity=str(owner_id))
+    headers = {"Authorization": f"Bearer {token}"}
+    month = date.today().strftime("%Y-%m")
+
+    def reset_current_month():
+        # Drop this month's payments (and anything referencing them) so
+        # generation has real work to do on every run.
+        with app.app_context():
+            payment_ids = select(Payment.id).where(Payment.month == month)
+            for table in reversed(db.metadata.sorted_tables):
+                for fk in table.foreign_keys:
+                    if fk.column.table is Payment.__table__:
+                        db.session.execute(table.delete().where(fk.parent.in_(payment_ids)))
+            db.session.execute(Payment.__table__.delete().where(Payment.month == month))
+            db.session.commit()
+
+    def reset_reminders():
+        with app.app_context():
+            db.session.execute(NotificationOutbox.__table__.delete())
+            db.session.execute(ReminderLog.__table__.delete())
+            db.session.execute(ReminderSchedule.__table__.update().values(processed_at=None))
+            db.session.commit()
+
+    def fill_outbox():
+        # Pending intents from a full-range shard, for the dispatcher to send.
+        reset_reminders()
+        with app.app_context():
+            send_rent_reminder_shard(0, SHARD_BUCKETS)
+
+    def get(path):
+        def call():
+            response = client.get(path, headers=headers)
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {path} -> {response.status_code}: {response.get_data(as_text=True)[:200]}")
+            return response.get_json()
+        return call
+
+    def rows(result):
+        if isinstance(result, list):
+            return len(result)
+        for key in ("tenants", "payments"):
+            if isinstance(result, dict) and key in result:
+                return len(result[key])
+        return 1
+
+    return {
+        "task_generate_monthly_payments": dict(
+            fn=lambda: generate_monthly_payments(),
+            setup=reset_current_month,
+            items=lambda r: r["created"],
+        ),
+        "task_send_rent_reminders": dict(
+            # One shard over every bucket: the work a single worker would do.
+            fn=lambda: send_rent_reminder_shard(0, SHARD_BUCKETS),
+            setup=reset_reminders,
+            items=lambda r: r["enqueued"],
+        ),
+        "task_dispatch_notifications": dict(
+            # Drains the outbox through the (fake) transports.
+            fn=lambda: dispatch_notifications(),
+            setup=fill_outbox,
+            items=lambda r: r["sent"] + r["failed"],
+        ),
+        "api_dashboard_summary": dict(fn=get("/summary")),
+        "api_pending_summary": dict(fn=get("/pending/summary"), items=rows),
+        "api_overdue": dict(fn=get("/overdue"), items=rows),
+        "api_overdue_aging": dict(fn=get("/overdue/aging")),
+        "api_monthly_payments": dict(fn=get(f"/payments?month={month}"), items=rows),
+        "api_tenants_page": dict(fn=get("/tenants?per_page=50"), items=rows),
+        "api_tenants_by_balance": dict(fn=get("/tenants?sort=balance&per_page=50"), items=rows),
+        "api_tenants_search": dict(fn=get("/tenants?search=Tenant%201&per_page=50"), items=rows),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Defaults to a temporary SQLite file")
+    parser.add_argument("--owners", type=int, default=10)
+    parser.add_argument("--properties", type=int, default=2)
+    parser.add_argument("--tenants", type=int, default=25, help="Tenants per property")
+    parser.add_argument("--months", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--send-latency-ms", type=float, default=0, help="Injected latency per fake send")
+    parser.add_argument("--send-error-rate", type=float, default=0, help="Share of fake sends that fail")
+    parser.add_argument("--send-rate-limit-rate", type=float, default=0, help="Share of fake sends that are throttled")
+    parser.add_argument("--reminder-channels", help="DEFAULT_REMINDER_CHANNELS for the run, e.g. EMAIL,SMS,WHATSAPP")
+    parser.add_argument("--only", help="Comma separated benchmark names")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Compare against this JSON report")
+    parser.add_argument("--save-baseline", help="Write the JSON report as a new baseline")
+    parser.add_argument("--fail-on-regression", type=float, help="Exit 1 if a metric regresses by more than this percent")
+    args = parser.parse_args()
+
+    if args.reminder_channels:
+        os.environ["DEFAULT_REMINDER_CHANNELS"] = args.reminder_channels
+    database_url = harness.configure(args.database_url)
+
+    from app import create_app, db
+    from app.utils.transport import CHANNELS, configure_fake_transport
+    from seed import seed
+
+    app = create_app()
+    client = app.test_client()
+
+    with app.app_context():
+        db.create_all()
+        owner_ids = seed(args.owners, args.properties, args.tenants, args.months)
+        engine = db.engine
+
+    benchmarks = build_benchmarks(app, client, owner_ids[0])
+    selected = args.only.split(",") if args.only else list(benchmarks)
+
+    results = {}
+    for name in selected:
+        spec = benchmarks[name]
+        fakes = {
+            channel: configure_fake_transport(
+                channel,
+                latency_ms=args.send_latency_ms,
+                error_rate=args.send_error_rate,
+                rate_limit_rate=args.send_rate_limit_rate,
+                seed=42,
+            )
+            for channel in CHANNELS
+        }
+        with app.app_context():
+            results[name] = harness.run_benchmark(
+                spec["fn"],
+                engine,
+                repeat=args.repeat,
+                setup=spec.get("setup"),
+                items=spec.get("items"),
+            )
+        r = results[name]
+        if r["errors"]:
+            print(f"{name:<32} FAILED: {r['errors']} of {r['runs']} calls raised")
+            continue
+        sends = {
+            channel: {"attempts": f.attempts, "delivered": len(f.sent), "failed": f.failures, "throttled": f.throttled}
+            for channel, f in fakes.items() if f.attempts
+        }
+        if sends:
+            r["sends"] = sends
+        print(
+            f"{name:<32} {r['ops_per_sec']:>9} ops/s  p50={r['p50_ms']}ms p95={r['p95_ms']}ms "
+            f"p99={r['p99_ms']}ms queries={r['queries_per_op']} peak={r['peak_mem_kb']}KiB errors={r['errors']}"
+            + (f" items/s={r['items_per_sec']}" if "items_per_sec" in r else "")
+        )
+        for channel, stats in r.get("sends", {}).items():
+            print(f"    {channel:<9} {stats}")
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "database": database_url.split(":", 1)[0],
+        "dataset": {
+            "owners": args.owners,
+            "properties_per_owner": args.properties,
+            "tenants_per_property": args.tenants,
+            "months": args.months,
+        },
+        "transport": {
+            "latency_ms": args.send_latency_ms,
+            "error_rate": args.send_error_rate,
+            "rate_limit_rate": args.send_rate_limit_rate,
+        },
+        "results": results,
+    }
+
+    broken = harness.failed(report)
+    if broken:
+        # Timings of failing calls would poison a saved baseline or a comparison.
+        print(f"error: {len(broken)} benchmark(s) failed ({', '.join(broken)}); report not saved or compared", file=sys.stderr)
+        sys.exit(1)
+
+    if args.output:
+        harness.write_json(args.output, report)
+    if args.save_baseline:
+        harness.write_json(args.save_baseline, report)
+
+    if args.baseline:
+        baseline = harness.load_json(args.baseline)
+        if baseline.get("dataset") != report["dataset"]:
+            print("warning: baseline was recorded with a different dataset size")
+        lines, regressions = harness.compare(report, baseline, args.fail_on_regression or 10.0)
+        print("\n".join(lines))
+        if regressions and args.fail_on_regression is not None:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Synthetic dataset for the benchmarks.
+
+Import this module only after the benchmark environment is configured
+(see ``harness.configure``), since it imports the application.
+"""
+import random
+import uuid
+from datetime import date
+
+from app import db
+from app.models import User, Property, Tenant, Payment, PaymentStatus
+from app.utils.payments import refresh_tenant_rollups
+from app.utils.reminder_schedule import expand_schedule
+from app.utils.reminder_slots import reminder_bucket
+
+
+def _month_back(today, offset):
+    year, month = today.year, today.month - offset
+    while month < 1:
+        month += 12
+        year -= 1
+    return f"{year}-{month:02d}"
+
+
+def _insert(model, rows, chunk=1000):
+    for start in range(0, len(rows), chunk):
+        db.session.execute(model.__table__.insert(), rows[start:start + chunk])
+
+
+def seed(owners=10, properties=2, tenants=25, months=6, today=None, rng_seed=42):
+    """Insert owners → properties → tenants → ``months`` of payments.
+
+    The current month is PENDING for everyone, older months are mostly PAID
+    with a deterministic share of arrears. Due days are spread over 1..28 so
+    every day has BEFORE/ON/AFTER reminders to send.
+
+    Returns the list of owner ids.
+    """
+    today = today or date.today()
+    rng = random.Random(rng_seed)
+
+    users, props, tenant_rows, payment_rows = [], [], [], []
+    owner_ids = []
+
+    for o in range(owners):
+        owner_id = uuid.uuid4()
+        owner_ids.append(owner_id)
+        users.append({
+            "id": owner_id,
+            "username": f"owner{o}",
+            "email": f"owner{o}@bench.local",
+            "contact": f"8{o:09d}",
+            "password": "x",
+            "role": "OWNER",
+        })
+
+        for p in range(properties):
+            property_id = uuid.uuid4()
+            props.append({
+                "id": property_id,
+                "owner_id": owner_id,
+                "name": f"Property {o}-{p}",
+                "address": f"{p} Bench Road",
+            })
+
+            for t in range(tenants):
+                tenant_id = uuid.uuid4()
+                n = len(tenant_rows)
+                rent = float(rng.choice([8000, 12000, 15000, 22000]))
+                tenant_rows.append({
+                    "id": tenant_id,
+                    "property_id": property_id,
+                    "name": f"Tenant {n}",
+                    "phone": f"9{n:09d}",
+                    "email": f"tenant{n}@bench.local" if n % 5 else None,
+                    "rent_amount": rent,
+                    "maintenance_amount": 500.0,
+                    "due_day": (n % 28) + 1,
+                    "start_date": date(today.year - 1, 1, 1),
+                    "is_active": n % 20 != 0,
+                    "reminder_bucket": reminder_bucket(tenant_id),
+                })
+
+                for m in range(months):
+                    paid = m > 0 and rng.random() > 0.15
+                    payment_rows.append({
+                        "id": uuid.uuid4(),
+                        "tenant_id": tenant_id,
+                        "month": _month_back(today, m),
+                        "rent_amount": rent,
+                        "maintenance_amount": 500.0,
+                        "status": PaymentStatus.PAID if paid else PaymentStatus.PENDING,
+                        "paid_on": today if paid else None,
+                        "payment_mode": "UPI" if paid else None,
+                    })
+
+    _insert(User, users)
+    _insert(Property, props)
+    _insert(Tenant, tenant_rows)
+    _insert(Payment, payment_rows)
+    expand_schedule()
+    refresh_tenant_rollups()
+    db.session.commit()
+
+    return owner_ids
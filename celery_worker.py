@@ -1,3 +1,26 @@
+"""
+Celery worker entry point.
+
+Deployment profile -- run one worker per queue (see CeleryConfig in app/config.py):
+
+    # Notification I/O: many concurrent sends, little CPU
+    celery -A celery_worker.celery worker -Q notifications -P threads -c 16 -n notifications@%h
+    # (or -P gevent -c 200 with gevent installed)
+
+    # DB batch work: payment generation, reminder shards
+    celery -A celery_worker.celery worker -Q batch -P prefork -c 4 -n batch@%h
+
+    # Coordinators, beat ticks and chord callbacks
+    celery -A celery_worker.celery worker -Q default -P threads -c 4 -n default@%h
+
+A single worker can still consume everything for small setups:
+
+    celery -A celery_worker.celery worker -Q default,batch,notifications --loglevel=info
+
+Prefetch is 1 and acks are late, so each process holds one message at a time.
+Scale the batch queue with more workers/hosts; keep CELERY_VISIBILITY_TIMEOUT
+above the longest task duration.
+"""
 from app import celery, create_app
 app = create_app()
 app.app_context().push()
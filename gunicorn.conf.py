@@ -1,8 +1,49 @@
 import multiprocessing
+import os
+
+# --- Worker mode ---
+# sync    : one request per worker process (default)
+# gthread : GUNICORN_THREADS requests per worker, real OS threads
+# gevent  : GUNICORN_WORKER_CONNECTIONS greenlets per worker (requires gevent)
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "sync")
+
+if worker_class == "gevent":
+    # Patch before the app is preloaded so redis, psycopg2, smtplib and the
+    # Twilio HTTP session all pick up cooperative sockets.
+    from gevent import monkey
+    monkey.patch_all()
+
+    try:
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    except ImportError:
+        pass
+
+bind = f"0.0.0.0:{os.getenv('PORT', '10000')}"
+
+if worker_class == "sync":
+    workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+else:
+    workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+
+threads = int(os.getenv("GUNICORN_THREADS", 4)) if worker_class == "gthread" else 1
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 100))
+
+# --- Per-worker pool sizing ---
+# Every worker gets its own SQLAlchemy and Redis pools. Size them to the
+# number of requests one worker can have in flight so threads/greenlets
+# wait on the pool instead of opening unbounded connections.
+if worker_class == "gthread":
+    _concurrency = threads
+elif worker_class == "gevent":
+    _concurrency = min(worker_connections, int(os.getenv("GEVENT_DB_CONCURRENCY", 10)))
+else:
+    _concurrency = 1
+
+os.environ.setdefault("SQLALCHEMY_POOL_SIZE", str(_concurrency))
+os.environ.setdefault("SQLALCHEMY_MAX_OVERFLOW", str(max(1, _concurrency // 2)))
+os.environ.setdefault("REDIS_MAX_CONNECTIONS", str(_concurrency + 2))
 
-bind = "0.0.0.0:10000"
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
 timeout = 120
 graceful_timeout = 30
 backlog = 2048
@@ -0,0 +1,68 @@
+import os
+import sys
+import tempfile
+import uuid
+from datetime import date
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Same offline setup as the benchmarks: SQLite, fake transports, no Redis.
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='rmr-test-'), 'test.db')}"
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key-of-at-least-32-bytes")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("NOTIFICATION_TRANSPORT", "fake")
+os.environ.setdefault("MAIL_SUPPRESS_SEND", "True")
+os.environ.setdefault("JWT_BLACKLIST_ENABLED", "False")
+os.environ.setdefault("RATE_LIMITING_ENABLED", "False")
+os.environ.setdefault("TASK_LOCKS_ENABLED", "False")
+os.environ.setdefault("CELERY_TASK_ALWAYS_EAGER", "True")
+
+
+@pytest.fixture()
+def app():
+    from app import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture()
+def make_tenant(app):
+    """Create an owner, property and active tenant; returns the tenant."""
+    from app import db
+    from app.models import Property, Tenant, User
+
+    def make(due_day=28, start_date=None, **fields):
+        owner = User(username="owner", email=f"{uuid.uuid4().hex}@example.com", password="x")
+        db.session.add(owner)
+        db.session.flush()
+
+        prop = Property(owner_id=owner.id, name="Home", address="1 Main Road")
+        db.session.add(prop)
+        db.session.flush()
+
+        tenant = Tenant(
+            property_id=prop.id,
+            name="Tenant",
+            phone="9876543210",
+            email="tenant@example.com",
+            rent_amount=1000,
+            maintenance_amount=0,
+            due_day=due_day,
+            start_date=start_date or date(2020, 1, 1),
+            is_active=True,
+            **fields
+        )
+        db.session.add(tenant)
+        db.session.flush()
+        return tenant
+
+    return make
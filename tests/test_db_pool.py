@@ -0,0 +1,17 @@
+import os
+
+from app import create_app, db
+from app.utils import db_pool
+
+
+def test_fork_hook_is_registered_once(app, monkeypatch):
+    registered = []
+    monkeypatch.setattr(os, "register_at_fork", lambda **hooks: registered.append(hooks))
+    monkeypatch.setattr(db_pool, "_fork_hook_registered", False)
+
+    for _ in range(3):
+        latest = create_app()
+
+    assert len(registered) == 1
+    with latest.app_context():
+        assert list(db_pool._engines.values()) == [db.engine]
@@ -0,0 +1,18 @@
+import pytest
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+def test_metrics_disabled_by_default(app, client):
+    assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_requires_token_when_configured(app, client):
+    app.config.update(METRICS_ENABLED=True, METRICS_TOKEN="scrape-secret")
+
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
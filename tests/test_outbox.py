@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import NotificationOutbox, Payment
+from app.utils.outbox import claim_batch
+
+
+def expired_claim(tenant, month, attempts):
+    payment = Payment(tenant_id=tenant.id, month=month, rent_amount=500, maintenance_amount=0)
+    db.session.add(payment)
+    db.session.flush()
+    intent = NotificationOutbox(
+        payment_id=payment.id, reminder_type="ON", channel="EMAIL", status="SENDING",
+        attempts=attempts, next_attempt_at=datetime.utcnow() - timedelta(minutes=1)
+    )
+    db.session.add(intent)
+    return intent
+
+
+def test_expired_lease_counts_as_an_attempt(app, make_tenant):
+    app.config["OUTBOX_MAX_ATTEMPTS"] = 3
+    tenant = make_tenant()
+    retried = expired_claim(tenant, "2020-01", attempts=0)
+    exhausted = expired_claim(tenant, "2020-02", attempts=2)
+    db.session.commit()
+
+    claimed = claim_batch(10, 300)
+
+    assert [intent.id for intent in claimed] == [retried.id]
+    assert (retried.status, retried.attempts) == ("SENDING", 1)
+    assert (exhausted.status, exhausted.attempts) == ("FAILED", 3)
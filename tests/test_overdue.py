@@ -0,0 +1,39 @@
+from datetime import date
+
+from flask_jwt_extended import create_access_token
+
+from app import db
+from app.models import Payment, Property
+
+
+def owner_headers(tenant):
+    owner_id = db.session.get(Property, tenant.property_id).owner_id
+    return {"Authorization": f"Bearer {create_access_token(identity=str(owner_id))}"}
+
+
+def test_first_partial_month_is_not_overdue_before_start_date(app, make_tenant):
+    today = date.today()
+    tenant = make_tenant(due_day=1, start_date=today)
+    db.session.add(Payment(tenant_id=tenant.id, month=today.strftime("%Y-%m"), rent_amount=500, maintenance_amount=0))
+    db.session.commit()
+    headers = owner_headers(tenant)
+    client = app.test_client()
+
+    overdue = client.get("/overdue", headers=headers)
+    aging = client.get("/overdue/aging", headers=headers)
+
+    assert overdue.status_code == 200
+    assert overdue.get_json() == []
+    assert aging.get_json()["overdue_count"] == 0
+
+
+def test_earlier_months_are_overdue_from_their_due_day(app, make_tenant):
+    today = date.today()
+    tenant = make_tenant(due_day=1, start_date=date(2020, 1, 1))
+    db.session.add(Payment(tenant_id=tenant.id, month="2020-02", rent_amount=500, maintenance_amount=0))
+    db.session.commit()
+
+    payments = app.test_client().get("/overdue", headers=owner_headers(tenant)).get_json()
+
+    assert [p["due_date"] for p in payments] == ["2020-02-01"]
+    assert payments[0]["days_overdue"] == (today - date(2020, 2, 1)).days
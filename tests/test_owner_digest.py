@@ -0,0 +1,32 @@
+from datetime import date
+
+from app import db
+from app.models import Payment
+from app.utils.owner_digest import owner_digests
+
+
+def test_digest_splits_overdue_and_due_today(make_tenant):
+    today = date.today()
+    late = make_tenant(due_day=1, start_date=date(2020, 1, 1))
+    db.session.add(Payment(tenant_id=late.id, month="2020-02", rent_amount=500, maintenance_amount=0))
+    # A first partial month starting today is due today, not overdue.
+    new = make_tenant(due_day=1, start_date=today)
+    db.session.add(Payment(tenant_id=new.id, month=today.strftime("%Y-%m"), rent_amount=300, maintenance_amount=0))
+    db.session.commit()
+
+    digests = {d["email"]: d for d in owner_digests(today)}
+    late_digest = digests[late.property.owner.email]
+    new_digest = digests[new.property.owner.email]
+
+    assert [t["oldest_month"] for t in late_digest["overdue"]] == ["2020-02"]
+    assert new_digest["overdue"] == []
+    assert [t["amount"] for t in new_digest["due_today"]] == [300]
+
+
+def test_digest_task_is_never_redelivered(app):
+    from app import celery
+    from app.tasks import send_owner_digests
+
+    # A redelivered run would email owners a second time.
+    assert send_owner_digests.acks_late is False
+    assert celery.conf.task_routes["app.tasks.send_owner_digests"] == {"queue": "notifications"}
@@ -0,0 +1,29 @@
+import pytest
+from flask_jwt_extended import create_access_token
+
+
+@pytest.fixture()
+def put_rules(app, make_tenant):
+    owner_id = make_tenant().property.owner_id
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(owner_id))}"}
+    client = app.test_client()
+    return lambda offsets: client.put("/reminder-rules", json={"offsets": offsets}, headers=headers)
+
+
+@pytest.mark.parametrize("offsets", [5, "soon", [1, "x"], [True], None])
+def test_malformed_offsets_are_rejected_with_a_fixed_message(put_rules, offsets):
+    response = put_rules(offsets)
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "offsets must be a list of integers."}
+
+
+def test_offsets_out_of_range_are_rejected(put_rules):
+    assert put_rules([-2, 90]).status_code == 400
+
+
+def test_offsets_are_stored_sorted_and_unique(put_rules):
+    response = put_rules([3, -2, 3, 0])
+
+    assert response.status_code == 200
+    assert response.get_json()["offsets"] == [-2, 0, 3]
@@ -0,0 +1,83 @@
+from datetime import date
+
+from app import db
+from app.models import Payment, ReminderSchedule, Tenant
+from app.utils.payments import materialize_payments
+from app.utils.reminder_schedule import close_out_tenant, expand_schedule, reopen_tenant, reschedule_owner, reschedule_tenant
+
+
+def open_rows(tenant):
+    return (
+        ReminderSchedule.query
+        .join(Payment, ReminderSchedule.payment_id == Payment.id)
+        .filter(Payment.tenant_id == tenant.id, ReminderSchedule.processed_at.is_(None))
+        .count()
+    )
+
+
+def test_reactivation_reopens_upcoming_reminders(make_tenant):
+    tenant = make_tenant(due_day=31)
+    materialize_payments(date.today().strftime("%Y-%m"), Tenant.id == tenant.id)
+    expand_schedule(Payment.tenant_id == tenant.id, send_from=date.today())
+    before = open_rows(tenant)
+    assert before > 0
+
+    close_out_tenant(tenant.id)
+    tenant.is_active = False
+    db.session.flush()
+    assert open_rows(tenant) == 0
+
+    tenant.is_active = True
+    db.session.flush()
+    assert reopen_tenant(tenant.id) == before
+    assert open_rows(tenant) == before
+
+
+def test_inactive_tenants_get_no_schedule_rows(make_tenant):
+    tenant = make_tenant(due_day=31)
+    materialize_payments(date.today().strftime("%Y-%m"), Tenant.id == tenant.id)
+    tenant.is_active = False
+    db.session.flush()
+
+    expand_schedule(Payment.tenant_id == tenant.id)
+    reschedule_owner(tenant.property.owner_id)
+
+    assert open_rows(tenant) == 0
+
+
+def test_due_day_change_moves_open_reminders(make_tenant):
+    tenant = make_tenant(due_day=31)
+    materialize_payments(date.today().strftime("%Y-%m"), Tenant.id == tenant.id)
+    expand_schedule(Payment.tenant_id == tenant.id)
+
+    tenant.due_day = 1
+    db.session.flush()
+    reschedule_tenant(tenant.id)
+
+    due_dates = {
+        row.due_on
+        for row in ReminderSchedule.query.filter(ReminderSchedule.processed_at.is_(None))
+    }
+    assert due_dates <= {date.today().replace(day=1)}
+
+
+def test_backfill_command_schedules_existing_payments(app, make_tenant):
+    tenant = make_tenant(due_day=31)
+    materialize_payments(date.today().strftime("%Y-%m"), Tenant.id == tenant.id)
+    db.session.commit()
+    assert open_rows(tenant) == 0
+
+    result = app.test_cli_runner().invoke(args=["backfill-reminder-schedule"])
+
+    assert result.exit_code == 0, result.output
+    assert open_rows(tenant) > 0
+
+
+def test_first_partial_month_is_due_on_start_date(make_tenant):
+    today = date.today()
+    tenant = make_tenant(due_day=1, start_date=today)
+    materialize_payments(today.strftime("%Y-%m"), Tenant.id == tenant.id)
+    expand_schedule(Payment.tenant_id == tenant.id, send_from=today)
+
+    rows = ReminderSchedule.query.all()
+    assert rows and {row.due_on for row in rows} == {today}
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import TaskRun
+from app.utils.task_metrics import TaskRunRecorder, collect_task_runs, prune_task_runs
+
+
+def test_idle_successful_runs_are_not_persisted(app):
+    TaskRunRecorder("dispatch_notifications").finish()
+    assert TaskRun.query.count() == 0
+
+    busy = TaskRunRecorder("dispatch_notifications")
+    busy.count("claimed", 2)
+    busy.finish()
+    TaskRunRecorder("dispatch_notifications").finish("FAILED")
+    assert TaskRun.query.count() == 2
+
+
+def test_collect_reports_latest_run_per_task(app):
+    now = datetime.utcnow()
+    for name, age, status in [("a", 2, "FAILED"), ("a", 1, "SUCCESS"), ("b", 3, "SUCCESS")]:
+        db.session.add(TaskRun(task_name=name, status=status, started_at=now - timedelta(minutes=age), duration_ms=10))
+    db.session.commit()
+
+    duration = collect_task_runs()[0][3]
+    assert [(labels["task"], labels["status"]) for labels, _ in duration] == [("a", "SUCCESS"), ("b", "SUCCESS")]
+
+
+def test_prune_drops_runs_past_retention(app):
+    now = datetime.utcnow()
+    db.session.add(TaskRun(task_name="a", status="SUCCESS", started_at=now - timedelta(days=30)))
+    db.session.add(TaskRun(task_name="a", status="SUCCESS", started_at=now))
+    db.session.commit()
+
+    assert prune_task_runs(14) == 1
+    assert TaskRun.query.count() == 1
@@ -0,0 +1,60 @@
+from datetime import date
+
+from flask_jwt_extended import create_access_token
+
+from app import db
+from app.models import Payment, Tenant
+from app.utils.payments import refresh_tenant_rollups
+
+
+def test_paid_up_tenants_sort_last_by_balance(app, make_tenant):
+    owing = make_tenant(due_day=1)
+    # Second tenant on the same property, with nothing pending.
+    paid_up = Tenant(
+        property_id=owing.property_id, name="Paid up", phone="9876500000",
+        rent_amount=1000, maintenance_amount=0, due_day=1, start_date=date(2020, 1, 1), is_active=True
+    )
+    db.session.add(paid_up)
+    db.session.add(Payment(tenant_id=owing.id, month="2020-02", rent_amount=500, maintenance_amount=0))
+    db.session.flush()
+    refresh_tenant_rollups()
+    db.session.commit()
+
+    token = create_access_token(identity=str(owing.property.owner_id))
+    client = app.test_client()
+
+    for order in ("asc", "desc"):
+        response = client.get(f"/tenants?sort=balance&order={order}", headers={"Authorization": f"Bearer {token}"})
+        names = [t["name"] for t in response.get_json()["tenants"]]
+        assert names == ["Tenant", "Paid up"], order
+
+
+def test_default_order_is_newest_first(app, make_tenant):
+    older = make_tenant(due_day=1)
+    db.session.add(Payment(tenant_id=older.id, month="2020-02", rent_amount=500, maintenance_amount=0))
+    newer = Tenant(
+        property_id=older.property_id, name="Newer", phone="9876500001",
+        rent_amount=1000, maintenance_amount=0, due_day=1, start_date=date(2020, 1, 1), is_active=True
+    )
+    db.session.add(newer)
+    db.session.flush()
+    refresh_tenant_rollups()
+    db.session.commit()
+
+    token = create_access_token(identity=str(older.property.owner_id))
+    response = app.test_client().get("/tenants", headers={"Authorization": f"Bearer {token}"})
+    assert [t["name"] for t in response.get_json()["tenants"]] == ["Newer", "Tenant"]
+
+
+def test_backfill_command_computes_rollups(app, make_tenant):
+    tenant = make_tenant(due_day=1)
+    db.session.add(Payment(tenant_id=tenant.id, month="2020-02", rent_amount=500, maintenance_amount=0))
+    db.session.commit()
+    assert tenant.oldest_unpaid_month is None
+
+    result = app.test_cli_runner().invoke(args=["backfill-tenant-rollups"])
+
+    assert result.exit_code == 0, result.output
+    db.session.refresh(tenant)
+    assert (tenant.outstanding_balance, tenant.oldest_unpaid_month) == (500, "2020-02")
+    assert tenant.next_due_date == date(2020, 2, 1)